@@ -13,8 +13,10 @@ from .pathtools import (
     get_fov_sort_key,
 )
 from .pixel_value_statistics import (
+    NucleusPixelStatistics,
     RegionalPixelStatistics,
     compute_pixel_statistics,
+    compute_pixel_statistics_by_nucleus,
 )
 
 __version__ = "0.6.1"
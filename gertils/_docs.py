@@ -0,0 +1,38 @@
+"""Attachment of numpydoc-style docstrings, with an option to skip rendering entirely"""
+
+import os
+import sys
+from collections.abc import Callable
+from typing import TypeVar
+
+DocTarget = TypeVar("DocTarget")
+
+SKIP_DOCSTRINGS_ENV_VAR = "GERTILS_SKIP_DOCSTRINGS"
+
+
+def docstrings_are_skipped() -> bool:
+    """Determine whether docstring rendering should be skipped in this process.
+
+    Rendering is skipped when Python runs with docstrings stripped (-OO), or when
+    the environment variable named by SKIP_DOCSTRINGS_ENV_VAR is set to a truthy value.
+    """
+    if sys.flags.optimize >= 2:  # noqa: PLR2004
+        return True
+    return os.environ.get(SKIP_DOCSTRINGS_ENV_VAR, "").strip().lower() in {"1", "true", "yes"}
+
+
+_SKIP_DOCSTRINGS: bool = docstrings_are_skipped()
+
+
+def _leave_undocumented(target: DocTarget) -> DocTarget:
+    return target
+
+
+def doc(**kwargs: object) -> Callable[[DocTarget], DocTarget]:
+    """Build docstring for decorated member, or leave it undocumented if rendering is skipped."""
+    if _SKIP_DOCSTRINGS:
+        return _leave_undocumented
+    # Defer this import so that it's not paid at all when docstrings are skipped.
+    from numpydoc_decorator import doc as render_doc  # type: ignore[import]
+
+    return render_doc(**kwargs)  # type: ignore[no-any-return]
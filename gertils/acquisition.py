@@ -0,0 +1,125 @@
+"""Tools for following data as they're written during a live acquisition"""
+
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ._docs import doc
+from .pathtools import get_fov_sort_key
+from .types import FieldOfViewFrom1, PathLike
+from .zarr_tools import get_zarr_data_root
+
+__all__ = ["FovStoreReadyEvent", "FovStoreWatcher"]
+
+# A folder modified this recently may still get another entry within the same mtime "tick".
+_MTIME_SETTLE_SECONDS = 2.0
+
+
+@doc(
+    summary="Signal that the datastore for a field of view has become ready to read.",
+    parameters=dict(
+        fov="The field of view whose datastore is ready",
+        path="Path to the datastore (e.g., P0001.zarr folder) for the field of view",
+        data_root="Path to the folder in which the store's array data live",
+    ),
+)
+@dataclass(frozen=True)
+class FovStoreReadyEvent:  # noqa: D101
+    fov: FieldOfViewFrom1
+    path: Path
+    data_root: Path
+
+
+@doc(
+    summary="Incrementally maintain the mapping from field of view to datastore path for a folder.",
+    extended_summary=(
+        "Each poll costs a single stat of the folder when no entry has been added or removed, "
+        "plus a readiness check of each store seen but not yet ready. "
+        "The folder is listed again only when its modification time changes."
+    ),
+    parameters=dict(
+        folder="Path to folder in which datastores for fields of view appear",
+        extension="The extension of datastores to follow",
+        get_data_root="How to find where a store's data live, giving None while the store isn't ready",
+    ),
+    raises=dict(RuntimeError="If the same FOV is found to correspond to more than one path"),
+    see_also=dict(
+        find_single_path_by_fov="One-shot version of the FOV-to-path mapping",
+        get_zarr_data_root="The default readiness check, also used by read_zarr",
+    ),
+)
+class FovStoreWatcher:  # noqa: D101
+    def __init__(  # noqa: D107
+        self,
+        folder: PathLike,
+        *,
+        extension: str = ".zarr",
+        get_data_root: Callable[[Path], Optional[Path]] = get_zarr_data_root,
+    ) -> None:
+        self.folder: Path = Path(folder)
+        self.extension = extension
+        self._get_data_root = get_data_root
+        self._listing_mtime_ns: Optional[int] = None
+        self._known_names: set[str] = set()
+        self._pending: dict[FieldOfViewFrom1, Path] = {}
+        self._ready: dict[FieldOfViewFrom1, Path] = {}
+
+    @property
+    def ready_paths(self) -> Mapping[FieldOfViewFrom1, Path]:
+        """Map each field of view whose datastore is ready to the path of that datastore."""
+        return self._ready
+
+    @property
+    def pending_paths(self) -> Mapping[FieldOfViewFrom1, Path]:
+        """Map each field of view whose datastore exists but isn't yet ready to that path."""
+        return self._pending
+
+    def poll(self) -> list[FovStoreReadyEvent]:
+        """Update the index and return an event for each datastore which became ready."""
+        stat = self.folder.stat()
+        if stat.st_mtime_ns != self._listing_mtime_ns:
+            self._update_listing()
+            recently_modified = time.time() - stat.st_mtime < _MTIME_SETTLE_SECONDS
+            # If the folder was modified very recently, list it again on the next poll.
+            self._listing_mtime_ns = None if recently_modified else stat.st_mtime_ns
+        events: list[FovStoreReadyEvent] = []
+        for fov, path in sorted(self._pending.items()):
+            data_root = self._get_data_root(path)
+            if data_root is not None:
+                del self._pending[fov]
+                self._ready[fov] = path
+                events.append(FovStoreReadyEvent(fov=fov, path=path, data_root=data_root))
+        return events
+
+    def watch(
+        self,
+        *,
+        interval: float = 5.0,
+        should_stop: Callable[[], bool] = lambda: False,
+    ) -> Iterator[FovStoreReadyEvent]:
+        """Poll repeatedly, yielding each readiness event, until told to stop."""
+        while not should_stop():
+            yield from self.poll()
+            time.sleep(interval)
+
+    def _update_listing(self) -> None:
+        names = set(os.listdir(self.folder))
+        for name in self._known_names - names:
+            path = self.folder / name
+            for index in (self._pending, self._ready):
+                for removed_fov in [f for f, p in index.items() if p == path]:
+                    logging.debug("Datastore for FOV %s removed: %s", removed_fov.get, path)
+                    del index[removed_fov]
+        for name in sorted(names - self._known_names):
+            path = self.folder / name
+            fov = get_fov_sort_key(path, extension=self.extension)
+            if fov is None:
+                continue
+            if fov in self._pending or fov in self._ready:
+                raise RuntimeError(f"FOV {fov} already seen in folder! {self.folder}")
+            self._pending[fov] = path
+        self._known_names = names
@@ -0,0 +1,155 @@
+"""Cache, shared by concurrent jobs, of built environments keyed by the content of their specification (POSIX only)"""
+
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Union
+
+from ._docs import doc
+from .environments import (
+    CondaEnvironmentSpecification,
+    PipEnvironmentSpecification,
+    compute_environment_hash,
+)
+from .types import PathLike
+
+try:
+    import fcntl
+except ImportError:  # not POSIX, e.g. Windows
+    _HAVE_FLOCK = False
+else:
+    _HAVE_FLOCK = True
+
+__all__ = ["EnvironmentBuildCache"]
+
+# Bump this when the layout of a cache entry changes.
+_CACHE_FORMAT_VERSION = 1
+_MARKER_EXTENSION = ".json"
+_LOCK_EXTENSION = ".lock"
+
+EnvironmentSpecification = Union[CondaEnvironmentSpecification, PipEnvironmentSpecification]
+
+
+@doc(
+    summary="Cache of built environments, keyed by the hash of their specification and shared among concurrent jobs.",
+    extended_summary=(
+        "Each environment is built in place, in a folder named by compute_environment_hash, "
+        "so a job whose specification matches a finished build reuses it without building. "
+        "Jobs coordinate through a file lock per entry: only one job builds a given "
+        "environment while others wait for it, and an environment in use by any job is never "
+        "evicted. Once there are more entries than allowed, the least recently used ones "
+        "which aren't in use are removed. Locks are POSIX advisory locks (flock), which are "
+        "released if a job dies, so the cache is available only on POSIX systems."
+    ),
+    parameters=dict(
+        folder="Path to folder in which to build and keep environments; created if needed",
+        max_entries="Maximum number of environments to keep",
+    ),
+    raises=dict(
+        ValueError="If the maximum number of entries isn't positive",
+        RuntimeError="If file locking with flock isn't available, as on Windows",
+    ),
+    see_also=dict(compute_environment_hash="The function which keys the cache"),
+)
+class EnvironmentBuildCache:  # noqa: D101
+    def __init__(self, folder: PathLike, *, max_entries: int) -> None:  # noqa: D107
+        if not _HAVE_FLOCK:
+            raise RuntimeError("Environment cache requires POSIX file locking (fcntl.flock)")
+        if max_entries <= 0:
+            raise ValueError(f"Maximum number of cache entries must be positive; got {max_entries}")
+        self.folder: Path = Path(folder)
+        self.max_entries = max_entries
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def get_prefix(self, env: EnvironmentSpecification) -> Path:
+        """Get the folder in which the given environment is (or would be) built."""
+        return self.folder / compute_environment_hash(env)
+
+    def is_built(self, env: EnvironmentSpecification) -> bool:
+        """Determine whether the given environment has a finished build in the cache."""
+        return self._marker_path(compute_environment_hash(env)).is_file()
+
+    @contextlib.contextmanager
+    def acquire(
+        self, env: EnvironmentSpecification, *, build: Callable[[Path], None]
+    ) -> Iterator[Path]:
+        """Get the built environment, building it first if needed, and keep it from eviction while in use.
+
+        The build function is given the folder in which to create the environment, e.g.
+        as the prefix for conda or the target for venv. If it fails, its partial output
+        is removed, and the next job to acquire the environment builds it again.
+        """
+        key = compute_environment_hash(env)
+        prefix = self.folder / key
+        marker = self._marker_path(key)
+        with self._open_lock(key) as lock_fd:
+            fcntl.flock(lock_fd, fcntl.LOCK_SH)
+            if not marker.is_file():
+                # Converting a lock isn't atomic, so check again once we hold it exclusively.
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                if not marker.is_file():
+                    self._build(env, prefix=prefix, marker=marker, build=build)
+                fcntl.flock(lock_fd, fcntl.LOCK_SH)
+            else:
+                logging.debug("Environment cache hit: %s", prefix)
+            os.utime(marker)  # Record the use, for least-recently-used eviction.
+            self._evict()
+            yield prefix
+
+    def _build(
+        self,
+        env: EnvironmentSpecification,
+        *,
+        prefix: Path,
+        marker: Path,
+        build: Callable[[Path], None],
+    ) -> None:
+        logging.info("Environment cache miss, building: %s", prefix)
+        if prefix.exists():  # left by a failed build
+            shutil.rmtree(prefix)
+        try:
+            build(prefix)
+        except BaseException:
+            shutil.rmtree(prefix, ignore_errors=True)
+            raise
+        # Write the marker atomically, since its presence means the build is finished.
+        record = {"version": _CACHE_FORMAT_VERSION, "specification": repr(env)}
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(record, fh)
+        Path(tmp).replace(marker)
+
+    def _evict(self) -> None:
+        last_used = {}
+        for marker in self.folder.glob(f"*{_MARKER_EXTENSION}"):
+            with contextlib.suppress(FileNotFoundError):  # evicted by another job
+                last_used[marker] = marker.stat().st_mtime_ns
+        markers = sorted(last_used, key=last_used.__getitem__, reverse=True)
+        for marker in markers[self.max_entries :]:
+            key = marker.name.removesuffix(_MARKER_EXTENSION)
+            with self._open_lock(key) as lock_fd:
+                try:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # in use, or being rebuilt
+                logging.debug("Evicting environment from cache: %s", self.folder / key)
+                # Remove the marker first, so that a partial removal reads as a failed build.
+                marker.unlink(missing_ok=True)
+                shutil.rmtree(self.folder / key, ignore_errors=True)
+                # The lock file stays: another job may have it open, waiting to lock it.
+
+    @contextlib.contextmanager
+    def _open_lock(self, key: str) -> Iterator[int]:
+        fd = os.open(self.folder / f"{key}{_LOCK_EXTENSION}", os.O_RDWR | os.O_CREAT)
+        try:
+            yield fd
+        finally:
+            os.close(fd)  # also releases any lock held through this descriptor
+
+    def _marker_path(self, key: str) -> Path:
+        return self.folder / f"{key}{_MARKER_EXTENSION}"
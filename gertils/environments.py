@@ -1,6 +1,10 @@
 """Types and tools for working with environment specifications"""
 
+import hashlib
+import json
+import re
 import string
+from collections.abc import Iterable
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Union
@@ -13,8 +17,10 @@ __all__ = [
     "PipEnvironmentSpecification",
     "RepeatedEnvironmentElementException",
     "combine_pip_environments",
+    "compute_environment_hash",
     "conda2pip",
     "read_pip_env_file",
+    "read_pip_env_files",
     "write_env_file",
 ]
 
@@ -31,7 +37,7 @@ class CondaEnvironmentSpecification:
 
     def __post_init__(self) -> None:
         if self.pip_dependencies and "pip" not in self.conda_dependencies:
-            self.conda_dependencies += "pip"
+            self.conda_dependencies = [*self.conda_dependencies, "pip"]
         repeats = {
             sn: reps
             for sn, reps in [
@@ -123,6 +129,70 @@ def read_pip_env_file(path: Path) -> PipEnvironmentSpecification:
     return PipEnvironmentSpecification(name=None, dependencies=[line.strip() for line in lines])
 
 
+def read_pip_env_files(paths: Iterable[Path]) -> PipEnvironmentSpecification:
+    """Parse and combine many pip requirements.txt style files in a single pass.
+
+    This is equivalent to reading each file and combining the results with
+    combine_pip_environments, but dependencies are deduplicated once over all files
+    rather than as each file is added, and just one specification is built.
+    """
+    deps: list[str] = []
+    for path in paths:
+        with path.open() as envfile:
+            file_deps = [line.strip() for line in envfile if line.strip()]
+        reps = count_repeats(file_deps)
+        if reps:
+            raise RepeatedEnvironmentElementException(
+                f"Repeated dependencies for pip environment in {path}: {reps}"
+            )
+        deps.extend(file_deps)
+    return PipEnvironmentSpecification(name=None, dependencies=list(uniquify(deps)))
+
+
+def compute_environment_hash(
+    env: Union[CondaEnvironmentSpecification, PipEnvironmentSpecification],
+) -> str:
+    """Compute a digest of what an environment specification would install.
+
+    Dependencies are compared in a canonical form (whitespace removed, and package name
+    lowercased, with pip's equivalence of '-', '_', and '.' for pip dependencies) and
+    without regard to order, since neither affects what's installed. The order of conda
+    channels is kept, since it sets their priority. The environment's name is ignored.
+    The digest is kept short (32 hexadecimal characters), as it may name the folder of a
+    conda prefix or venv, whose path length is limited by conda's prefix replacement and
+    by the kernel's limit on the length of a script's #! line.
+    """
+    canonical: dict[str, object]
+    if isinstance(env, PipEnvironmentSpecification):
+        canonical = {"kind": "pip", "pip": _canonicalize_pip_dependencies(env.dependencies)}
+    elif isinstance(env, CondaEnvironmentSpecification):
+        canonical = {
+            "kind": "conda",
+            "python": re.sub(r"\s+", "", env.python_spec),
+            "channels": [c.strip() for c in env.channels],
+            "conda": sorted({re.sub(r"\s+", "", d).lower() for d in env.conda_dependencies}),
+            "pip": _canonicalize_pip_dependencies(env.pip_dependencies),
+        }
+    else:
+        raise TypeError(f"Environment to hash is not a supported type: {type(env).__name__}")
+    return hashlib.blake2b(
+        json.dumps(canonical, sort_keys=True).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def _canonicalize_pip_dependencies(deps: Iterable[str]) -> list[str]:
+    return sorted({_canonicalize_pip_dependency(d) for d in deps})
+
+
+def _canonicalize_pip_dependency(dep: str) -> str:
+    dep = re.sub(r"\s+", "", dep)
+    match = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", dep)
+    if match is None:
+        return dep
+    name = re.sub(r"[-_.]+", "-", match.group()).lower()
+    return name + dep[match.end() :]
+
+
 def write_env_file(
     env: Union[CondaEnvironmentSpecification, PipEnvironmentSpecification], path: Path
 ) -> Path:
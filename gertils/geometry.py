@@ -4,7 +4,8 @@ from dataclasses import dataclass
 from typing import Union
 
 import numpy as np
-from numpydoc_decorator import doc  # type: ignore[import]
+
+from ._docs import doc
 
 ZCoordinate = Union[int, float, np.float64]  # int to accommodate notion of "z-slice"
 
@@ -49,3 +50,34 @@ class ImagePoint3D(ImagePoint2D):  # noqa: D101
             raise TypeError(f"Bad z ({type(self.z).__name__}: {self.z}")
         if self.z < 0:
             raise ValueError(f"z-coordinate is negative! {self}")
+
+
+@doc(
+    summary="Bundle pixel bounds in x and y to create a rectangular region in 2D space.",
+    extended_summary="Each lower bound is inclusive, and each upper bound is exclusive, as for slicing.",
+    parameters=dict(
+        x_min="Lower (inclusive) bound in x",
+        x_max="Upper (exclusive) bound in x",
+        y_min="Lower (inclusive) bound in y",
+        y_max="Upper (exclusive) bound in y",
+    ),
+    raises=dict(
+        TypeError="If any bound isn't an integer",
+        ValueError="If any bound is negative, or if the box is empty along either axis",
+    ),
+)
+@dataclass(kw_only=True, frozen=True)
+class BoundingBox2D:  # noqa: D101
+    x_min: int
+    x_max: int
+    y_min: int
+    y_max: int
+
+    def __post_init__(self) -> None:
+        bounds = [self.x_min, self.x_max, self.y_min, self.y_max]
+        if not all(isinstance(b, int) for b in bounds):
+            raise TypeError(f"At least one bound isn't an integer! {self}")
+        if any(b < 0 for b in bounds):
+            raise ValueError(f"At least one bound is negative! {self}")
+        if self.x_min >= self.x_max or self.y_min >= self.y_max:
+            raise ValueError(f"Bounding box is empty! {self}")
@@ -1,32 +1,128 @@
 """Utilities for working with GPUs"""
 
+import functools
 import logging
+import os
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-try:
-    import tensorflow as tf  # type: ignore[import]
-except ModuleNotFoundError:
-    logging.exception("Cannot import tensorflow, so cannot use module: %s", __file__)
-    raise
-else:
+if TYPE_CHECKING:
     from tensorflow.python.eager.context import PhysicalDevice as TFPhysDev  # type: ignore[import]
 
 __all__ = [
+    "GpuInventory",
+    "count_gpus",
     "count_tensorflow_gpus",
+    "detect_gpus",
+    "get_gpu_inventory",
     "list_tensorflow_gpus",
     "print_tensorflow_gpu_count",
 ]
 
+CUDA_VISIBLE_DEVICES_ENV_VAR = "CUDA_VISIBLE_DEVICES"
+DEFAULT_PROC_FOLDER = Path("/proc/driver/nvidia")
+DEFAULT_DEV_FOLDER = Path("/dev")
+
+_DEVICE_FILE_PATTERN = re.compile(r"nvidia(\d+)")
+_DEVICE_UUID_PREFIXES = ("GPU-", "MIG-")
+
+
+@dataclass(frozen=True)
+class GpuInventory:
+    """The GPUs available to this process, and where that information came from"""
+
+    devices: tuple[str, ...]
+    source: str
+
+    @property
+    def count(self) -> int:
+        """Number of GPUs available"""
+        return len(self.devices)
+
+
+def detect_gpus(
+    *,
+    environ: Optional[Mapping[str, str]] = None,
+    proc_folder: Path = DEFAULT_PROC_FOLDER,
+    dev_folder: Path = DEFAULT_DEV_FOLDER,
+) -> GpuInventory:
+    """Take inventory of the GPUs available to this process, without importing any GPU framework.
+
+    The NVIDIA driver's listing of GPUs under /proc gives the physical devices, or, failing
+    that, the /dev/nvidiaN device files do. If CUDA_VISIBLE_DEVICES is set, it restricts
+    those as CUDA does: an empty value (or -1) hides all devices, and the list ends at the
+    first entry which isn't a valid device index or UUID. With no physical GPU, there's
+    no GPU available, whatever the value of CUDA_VISIBLE_DEVICES.
+    """
+    environ = os.environ if environ is None else environ
+    physical, physical_source = _find_physical_gpus(proc_folder=proc_folder, dev_folder=dev_folder)
+    visible = environ.get(CUDA_VISIBLE_DEVICES_ENV_VAR)
+    if visible is None or not physical:
+        return GpuInventory(devices=physical, source=physical_source)
+    devices: list[str] = []
+    for token in (t.strip() for t in visible.split(",")):
+        valid_index = token.isdigit() and int(token) < len(physical)
+        if not (valid_index or token.startswith(_DEVICE_UUID_PREFIXES)):
+            break
+        devices.append(token)
+    return GpuInventory(devices=tuple(devices), source=CUDA_VISIBLE_DEVICES_ENV_VAR)
+
+
+@functools.cache
+def get_gpu_inventory(*, use_tensorflow: bool = False) -> GpuInventory:
+    """Take inventory of the GPUs available to this process, once per process.
+
+    The result of detect_gpus is cached; call get_gpu_inventory.cache_clear() to take
+    inventory again. Only if requested, and only if no GPU is otherwise found, is
+    tensorflow imported to ask it for the GPUs it can see.
+    """
+    inventory = detect_gpus()
+    if use_tensorflow and inventory.count == 0:
+        devices = tuple(dev.name for dev in list_tensorflow_gpus())
+        inventory = GpuInventory(devices=devices, source="tensorflow")
+    logging.debug("GPU inventory: %s", inventory)
+    return inventory
+
+
+def count_gpus(*, use_tensorflow: bool = False) -> int:
+    """Count the GPUs available to this process, as found by get_gpu_inventory."""
+    return get_gpu_inventory(use_tensorflow=use_tensorflow).count
+
 
 def count_tensorflow_gpus() -> int:
     """Count the number of GPUs that tensorflow can see."""
     return len(list_tensorflow_gpus())
 
 
-def list_tensorflow_gpus() -> list[TFPhysDev]:  # type: ignore[no-any-unimported]
-    """List the GPUs that tensorflow can see."""
+def list_tensorflow_gpus() -> list["TFPhysDev"]:  # type: ignore[no-any-unimported]
+    """List the GPUs that tensorflow can see, importing tensorflow if it's not yet imported."""
+    try:
+        import tensorflow as tf  # type: ignore[import]
+    except ModuleNotFoundError:
+        logging.exception("Cannot import tensorflow, so cannot list GPUs with it")
+        raise
     return tf.config.list_physical_devices("GPU")  # type: ignore[no-any-return]
 
 
 def print_tensorflow_gpu_count() -> None:
     """Print the number of GPUs that tensorflow can see."""
     print(f"Num GPUs Available: {count_tensorflow_gpus()}")  # noqa: T201
+
+
+def _find_physical_gpus(*, proc_folder: Path, dev_folder: Path) -> tuple[tuple[str, ...], str]:
+    """Find the physical GPUs from the driver's listing, or else from the device files."""
+    gpus_folder = proc_folder / "gpus"
+    if gpus_folder.is_dir():
+        return tuple(sorted(p.name for p in gpus_folder.iterdir())), str(gpus_folder)
+    if dev_folder.is_dir():
+        indices = sorted(
+            int(m.group(1))
+            for m in (_DEVICE_FILE_PATTERN.fullmatch(p.name) for p in dev_folder.iterdir())
+            if m is not None
+        )
+        if indices:
+            return tuple(f"nvidia{i}" for i in indices), str(dev_folder)
+    return (), "none"
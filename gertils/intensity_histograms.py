@@ -0,0 +1,177 @@
+"""Streaming, exact histograms of pixel intensity per channel, across all fields of view"""
+
+import dataclasses
+import itertools
+from collections.abc import Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+import zarr  # type: ignore[import]
+
+from ._docs import doc
+from .types import ImagingChannel
+from .zarr_tools import ZarrParseException, get_zarr_data_root
+
+__all__ = ["NUM_INTENSITY_BINS", "IntensityHistogram", "compute_channel_histograms"]
+
+# One bin per possible value of a 16-bit pixel, so that histograms are exact
+NUM_INTENSITY_BINS = 2**16
+
+
+@doc(
+    summary="Exact histogram of integer pixel intensities, with one bin per possible value",
+    extended_summary=(
+        "The histogram's size is fixed, regardless of the number of pixels counted, and "
+        "histograms of different parts of a dataset merge by addition into the histogram of the whole."
+    ),
+    parameters=dict(counts="Number of pixels with each value, indexed by value"),
+    raises=dict(ValueError="If the counts aren't a 1D array with one entry per possible value"),
+)
+@dataclasses.dataclass(frozen=True)
+class IntensityHistogram:  # noqa: D101
+    counts: npt.NDArray[np.int64]
+
+    def __post_init__(self) -> None:
+        if self.counts.shape != (NUM_INTENSITY_BINS,):
+            raise ValueError(
+                f"Histogram counts must have shape ({NUM_INTENSITY_BINS},), not {self.counts.shape}"
+            )
+
+    @classmethod
+    def empty(cls) -> "IntensityHistogram":
+        """Create a histogram with no pixels counted."""
+        return cls(np.zeros(NUM_INTENSITY_BINS, dtype=np.int64))
+
+    @classmethod
+    def from_values(cls, values: npt.NDArray[np.generic]) -> "IntensityHistogram":
+        """Count the values of an array of unsigned integers of at most 16 bits."""
+        _check_pixel_dtype(values.dtype)
+        return cls(np.bincount(values.ravel(), minlength=NUM_INTENSITY_BINS).astype(np.int64))
+
+    def __add__(self, other: "IntensityHistogram") -> "IntensityHistogram":
+        """Merge the counts of two histograms."""
+        return IntensityHistogram(self.counts + other.counts)
+
+    @property
+    def total(self) -> int:
+        """Number of pixels counted"""
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        """Mean of pixel values counted, NaN if none were"""
+        total = self.total
+        if total == 0:
+            return float("nan")
+        return float(self.counts @ np.arange(NUM_INTENSITY_BINS, dtype=np.float64)) / total
+
+    @property
+    def std(self) -> float:
+        """Standard deviation (population) of pixel values counted, NaN if none were"""
+        total = self.total
+        if total == 0:
+            return float("nan")
+        deviations = np.arange(NUM_INTENSITY_BINS, dtype=np.float64) - self.mean
+        return float(np.sqrt((self.counts @ deviations**2) / total))
+
+    def quantile(self, q: Union[float, Sequence[float]]) -> Union[int, list[int]]:
+        """Get the least pixel value at or below which at least the given fraction of pixels lie.
+
+        This is the inverted empirical distribution function, so it agrees with
+        numpy.quantile with method="inverted_cdf" on the pixels themselves.
+        """
+        total = self.total
+        if total == 0:
+            raise ValueError("Cannot take quantile of empty histogram")
+        fractions = np.asarray(q, dtype=np.float64)
+        if np.any((fractions < 0) | (fractions > 1)):
+            raise ValueError(f"Quantile(s) must be in [0, 1]; got {q}")
+        ranks = np.maximum(np.ceil(fractions * total), 1)
+        values = np.searchsorted(np.cumsum(self.counts), ranks, side="left")
+        return values.tolist()  # type: ignore[no-any-return]
+
+
+@doc(
+    summary="Compute the histogram of pixel intensities of each channel, across many datastores.",
+    extended_summary=(
+        "Each store is read one chunk at a time, so memory use depends on the chunk size and "
+        "number of workers but not on the number or size of the stores. Each chunk is decoded "
+        "once, however many of the requested channels it holds. Each worker counts a whole "
+        "store, and the workers' histograms are summed as they finish, with no more tasks "
+        "submitted than there are workers. Stores are opened as needed."
+    ),
+    parameters=dict(
+        paths="Paths to the datastores, e.g. values of the mapping from find_single_path_by_fov",
+        channels="Channels for which to compute histograms",
+        max_workers="Number of threads to read and count chunks concurrently",
+    ),
+    raises=dict(
+        ZarrParseException="If a datastore has no array metadata",
+        ValueError="If a store's array isn't 4D (channel, z, y, x) or isn't of unsigned integers of at most 16 bits",
+    ),
+    returns="Histogram of pixel intensities for each channel, over all the datastores",
+)
+def compute_channel_histograms(  # noqa: D103
+    paths: Iterable[Path], *, channels: Iterable[ImagingChannel], max_workers: int = 4
+) -> dict[ImagingChannel, IntensityHistogram]:
+    channels = list(channels)
+    histograms = {ch: IntensityHistogram.empty() for ch in channels}
+    # Stores are opened only as their tasks are submitted, and at most max_workers tasks are
+    # pending at once, so no more partial histograms than that are ever held.
+    pending: set[Future[dict[ImagingChannel, IntensityHistogram]]] = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for arr in map(_open_pixel_array, paths):
+            pending.add(pool.submit(_count_store, arr, channels))
+            if len(pending) >= max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _add_histograms(histograms, future.result())
+        for future in as_completed(pending):
+            _add_histograms(histograms, future.result())
+    return histograms
+
+
+def _open_pixel_array(path: Path) -> zarr.Array:  # type: ignore[no-any-unimported]
+    data_root = get_zarr_data_root(path)
+    if data_root is None:
+        raise ZarrParseException(path=path, msg="Failed to find .zarray to indicate data folder")
+    arr = zarr.open_array(str(data_root), mode="r")
+    if len(arr.shape) != 4:  # noqa: PLR2004
+        raise ValueError(f"Array must be 4D (channel, z, y, x), not {len(arr.shape)}D: {path}")
+    _check_pixel_dtype(arr.dtype)
+    return arr
+
+
+def _count_store(  # type: ignore[no-any-unimported]
+    arr: zarr.Array, channels: list[ImagingChannel]
+) -> dict[ImagingChannel, IntensityHistogram]:
+    counts = {ch: np.zeros(NUM_INTENSITY_BINS, dtype=np.int64) for ch in channels}
+    # Read each chunk which holds any requested channel once, and count each such channel in it.
+    channel_chunk = arr.chunks[0]
+    channel_starts = sorted({ch.get - ch.get % channel_chunk for ch in channels})
+    spatial_starts = [range(0, n, c) for n, c in zip(arr.shape[1:], arr.chunks[1:], strict=True)]
+    for channel_start, *start in itertools.product(channel_starts, *spatial_starts):
+        region = tuple(slice(i, i + c) for i, c in zip(start, arr.chunks[1:], strict=True))
+        block = arr[(slice(channel_start, channel_start + channel_chunk), *region)]
+        for ch in counts:
+            if channel_start <= ch.get < channel_start + channel_chunk:
+                counts[ch] += np.bincount(
+                    block[ch.get - channel_start].ravel(), minlength=NUM_INTENSITY_BINS
+                )
+    return {ch: IntensityHistogram(c) for ch, c in counts.items()}
+
+
+def _add_histograms(
+    histograms: dict[ImagingChannel, IntensityHistogram],
+    partials: dict[ImagingChannel, IntensityHistogram],
+) -> None:
+    for ch, hist in partials.items():
+        histograms[ch] += hist
+
+
+def _check_pixel_dtype(dtype: np.dtype) -> None:  # type: ignore[type-arg]
+    if dtype.kind != "u" or dtype.itemsize > 2:  # noqa: PLR2004
+        raise ValueError(f"Pixel values must be unsigned integers of at most 16 bits, not {dtype}")
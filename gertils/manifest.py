@@ -0,0 +1,261 @@
+"""Consolidated manifest of the fields of view of an experiment, and their ZARR datastores"""
+
+import argparse
+import dataclasses
+import functools
+import json
+import logging
+import os
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Optional
+
+from ._docs import doc
+from .pathtools import find_single_path_by_fov
+from .types import FieldOfViewFrom1, PathLike
+from .zarr_tools import ZarrParseException, get_zarr_data_root
+
+__all__ = [
+    "DEFAULT_MANIFEST_FILENAME",
+    "ExperimentManifest",
+    "FovStoreEntry",
+    "build_manifest",
+    "read_manifest",
+    "write_manifest",
+]
+
+DEFAULT_MANIFEST_FILENAME = "gertils_manifest.json"
+_FORMAT_VERSION = 1
+
+# A folder modified this recently may still get another entry within the same mtime "tick".
+_MTIME_SETTLE_SECONDS = 2.0
+
+
+@doc(
+    summary="Record of the datastore for a single field of view",
+    parameters=dict(
+        fov="The field of view",
+        path="Path to the datastore (e.g., P0001.zarr folder) for the field of view",
+        data_root="Path to the folder in which the store's array data live",
+        shape="Shape of the stored array",
+        dtype="Data type of the stored array, as in the ZARR metadata",
+        chunks="Shape of each chunk of the stored array",
+        mtime_ns="Modification time, in nanoseconds, of the store's array metadata",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class FovStoreEntry:  # noqa: D101
+    fov: FieldOfViewFrom1
+    path: Path
+    data_root: Path
+    shape: tuple[int, ...]
+    dtype: str
+    chunks: tuple[int, ...]
+    mtime_ns: int
+
+
+@doc(
+    summary="Consolidated record of the datastore for each field of view in an experiment's folder",
+    parameters=dict(
+        folder="The folder in which the datastores are found, as an absolute path",
+        extension="The extension of the datastores",
+        folder_mtime_ns=(
+            "Modification time, in nanoseconds, of the folder when the manifest was built; "
+            "None if the folder had been modified too recently for that time to be trusted"
+        ),
+        entries="Record of the datastore for each field of view",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class ExperimentManifest:  # noqa: D101
+    folder: Path
+    extension: str
+    folder_mtime_ns: Optional[int]
+    entries: Mapping[FieldOfViewFrom1, FovStoreEntry]
+
+    @property
+    def paths_by_fov(self) -> dict[FieldOfViewFrom1, Path]:
+        """Map each field of view to the path of its datastore, as find_single_path_by_fov does."""
+        return {fov: entry.path for fov, entry in self.entries.items()}
+
+    @functools.cached_property
+    def _entries_by_path(self) -> dict[Path, FovStoreEntry]:
+        return {entry.path: entry for entry in self.entries.values()}
+
+    def get_entry_by_path(self, path: Path) -> Optional[FovStoreEntry]:
+        """Find the entry for the datastore at the given (absolute or relative) path, if there is one."""
+        return self._entries_by_path.get(path.resolve())
+
+    def is_stale(self, *, check_stores: bool = False) -> bool:
+        """Determine whether the manifest may no longer reflect the folder.
+
+        Only the folder itself is checked by default, which detects datastores added or
+        removed with a single stat. To also detect rewritten array metadata, check each
+        store, which costs one stat per field of view but still no listing. A manifest
+        built just after the folder was modified is always stale, since a datastore added
+        within the same tick of the folder's modification time wouldn't change it.
+        """
+        if self.folder_mtime_ns is None:
+            return True
+        try:
+            if self.folder.stat().st_mtime_ns != self.folder_mtime_ns:
+                return True
+            if check_stores:
+                return any(
+                    (e.data_root / ".zarray").stat().st_mtime_ns != e.mtime_ns
+                    for e in self.entries.values()
+                )
+        except FileNotFoundError:
+            return True
+        return False
+
+
+@doc(
+    summary="Build the manifest for the datastores directly in the given folder.",
+    parameters=dict(
+        folder="Path to folder in which to find datastores",
+        extension="The extension of datastores to record",
+    ),
+    raises=dict(
+        RuntimeError="If the same FOV is found to correspond to more than one path",
+        ZarrParseException="If a datastore has no array metadata",
+    ),
+    returns="Manifest of the datastores found",
+)
+def build_manifest(folder: PathLike, *, extension: str = ".zarr") -> ExperimentManifest:  # noqa: D103
+    folder = Path(folder).resolve()
+    stat = folder.stat()
+    # If the folder was modified very recently, don't trust its modification time.
+    recently_modified = time.time() - stat.st_mtime < _MTIME_SETTLE_SECONDS
+    folder_mtime_ns = None if recently_modified else stat.st_mtime_ns
+    entries = {}
+    for fov, path in sorted(find_single_path_by_fov(folder, extension=extension).items()):
+        data_root = get_zarr_data_root(path)
+        if data_root is None:
+            raise ZarrParseException(
+                path=path, msg="Failed to find .zarray to indicate data folder"
+            )
+        metadata_path = data_root / ".zarray"
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        entries[fov] = FovStoreEntry(
+            fov=fov,
+            path=path,
+            data_root=data_root,
+            shape=tuple(metadata["shape"]),
+            dtype=str(metadata["dtype"]),
+            chunks=tuple(metadata["chunks"]),
+            mtime_ns=metadata_path.stat().st_mtime_ns,
+        )
+    return ExperimentManifest(
+        folder=folder, extension=extension, folder_mtime_ns=folder_mtime_ns, entries=entries
+    )
+
+
+@doc(
+    summary="Write the given manifest to a JSON file.",
+    extended_summary=(
+        "Paths are stored relative to the experiment's folder. If the file is written into that "
+        "folder, the recorded modification time of the folder is updated to account for the "
+        "creation of the file itself, so that the manifest isn't immediately stale (unless "
+        "the folder had been modified too recently when the manifest was built). The "
+        "manifest as written is returned, so use it rather than the one given."
+    ),
+    parameters=dict(
+        manifest="The manifest to write",
+        path="Path to which to write; by default, the standard filename in the experiment's folder",
+    ),
+    returns="Path to the file written, and the manifest as written",
+)
+def write_manifest(  # noqa: D103
+    manifest: ExperimentManifest, path: Optional[PathLike] = None
+) -> tuple[Path, ExperimentManifest]:
+    path = manifest.folder / DEFAULT_MANIFEST_FILENAME if path is None else Path(path)
+    path.write_text(json.dumps(_manifest_to_json(manifest), indent=2), encoding="utf-8")
+    if manifest.folder_mtime_ns is not None and path.parent.resolve() == manifest.folder.resolve():
+        # Rewriting an existing file in place doesn't change the folder's modification time.
+        folder_mtime_ns = manifest.folder.stat().st_mtime_ns
+        if folder_mtime_ns != manifest.folder_mtime_ns:
+            manifest = dataclasses.replace(manifest, folder_mtime_ns=folder_mtime_ns)
+            path.write_text(json.dumps(_manifest_to_json(manifest), indent=2), encoding="utf-8")
+    return path, manifest
+
+
+@doc(
+    summary="Read a manifest from a JSON file written by write_manifest.",
+    parameters=dict(
+        path="Path to the manifest file",
+        folder="Path to the experiment's folder, if it has moved since the manifest was written",
+    ),
+    raises=dict(ValueError="If the file's format version is unsupported"),
+    returns="The manifest",
+)
+def read_manifest(path: PathLike, *, folder: Optional[PathLike] = None) -> ExperimentManifest:  # noqa: D103
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported manifest format version ({data.get('version')}): {path}")
+    root = Path(data["folder"] if folder is None else folder).resolve()
+    entries = {}
+    for raw in data["entries"]:
+        fov = FieldOfViewFrom1(raw["fov"])
+        entries[fov] = FovStoreEntry(
+            fov=fov,
+            path=root / raw["path"],
+            data_root=root / raw["path"] / raw["data_root"],
+            shape=tuple(raw["shape"]),
+            dtype=raw["dtype"],
+            chunks=tuple(raw["chunks"]),
+            mtime_ns=raw["mtime_ns"],
+        )
+    return ExperimentManifest(
+        folder=root,
+        extension=data["extension"],
+        folder_mtime_ns=data["folder_mtime_ns"],
+        entries=entries,
+    )
+
+
+def _manifest_to_json(manifest: ExperimentManifest) -> dict[str, object]:
+    return {
+        "version": _FORMAT_VERSION,
+        "folder": str(manifest.folder),
+        "extension": manifest.extension,
+        "folder_mtime_ns": manifest.folder_mtime_ns,
+        "entries": [
+            {
+                "fov": fov.get,
+                "path": os.path.relpath(entry.path, manifest.folder),
+                "data_root": os.path.relpath(entry.data_root, entry.path),
+                "shape": list(entry.shape),
+                "dtype": entry.dtype,
+                "chunks": list(entry.chunks),
+                "mtime_ns": entry.mtime_ns,
+            }
+            for fov, entry in sorted(manifest.entries.items())
+        ],
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Build and write the manifest for an experiment's folder."""
+    parser = argparse.ArgumentParser(
+        description="Write a consolidated manifest of the per-FOV datastores in a folder"
+    )
+    parser.add_argument("folder", type=Path, help="Folder in which to find datastores")
+    parser.add_argument("--extension", default=".zarr", help="Extension of datastores")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help=f"Path to which to write manifest; default {DEFAULT_MANIFEST_FILENAME} in folder",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    manifest = build_manifest(args.folder, extension=args.extension)
+    path, manifest = write_manifest(manifest, args.output)
+    logging.info("Wrote manifest of %d datastore(s): %s", len(manifest.entries), path)
+    if manifest.folder_mtime_ns is None:
+        logging.warning("Folder was modified too recently, so the manifest will be stale: %s", path)
+
+
+if __name__ == "__main__":
+    main()
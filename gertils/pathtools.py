@@ -1,19 +1,25 @@
 """Tools for working with paths"""
 
+import logging
 import os
 import warnings
 from abc import ABC, abstractmethod
 from collections.abc import Iterable
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, TypeVar
-
-from numpydoc_decorator import doc  # type: ignore[import]
+from typing import TYPE_CHECKING, Optional, TypeVar
 
+from ._docs import doc
 from .types import FieldOfViewFrom1, PathLike
 
+if TYPE_CHECKING:
+    from .manifest import ExperimentManifest
+
 PW = TypeVar("PW", bound="PathWrapper")
 
+# fsspec protocols which name the local filesystem
+_LOCAL_PROTOCOLS = ("file", "local")
+
 
 @dataclass(frozen=True)
 class PathWrapper(ABC):
@@ -68,25 +74,55 @@ class NonExtantPath(PathWrapper):
             raise PathWrapperException(f"Path already exists: {self.path}")
 
 
+@doc(
+    summary="Determine whether the given path is a URL for a filesystem other than the local one.",
+    parameters=dict(path="The path or URL to check"),
+    returns="Whether the path is a URL (e.g., s3://bucket/experiment) with a protocol other than file",
+)
+def is_url(path: PathLike) -> bool:  # noqa: D103
+    if not isinstance(path, str) or "://" not in path:
+        return False
+    protocol, _ = path.split("://", 1)
+    return protocol not in _LOCAL_PROTOCOLS
+
+
+@doc(
+    summary="Get the local path named by the given path or local fsspec URL (e.g., file:///data/experiment).",
+    parameters=dict(path="The path or URL of a local file or folder"),
+    returns="The path, with the protocol of a local URL removed",
+)
+def to_local_path(path: PathLike) -> Path:  # noqa: D103
+    if isinstance(path, str) and "://" in path:
+        protocol, local_path = path.split("://", 1)
+        if protocol in _LOCAL_PROTOCOLS:
+            return Path(local_path)
+    return Path(path)
+
+
 @doc(
     summary=(
         "Directly in given folder, find all filepaths with a field" " of view embedded in filename."
     ),
     parameters=dict(
-        folder="Path to folder in which to find files",
+        folder="Path (or local URL, e.g. file:///data/experiment) of folder in which to find files",
         extensions="The file extensions to try to match",
     ),
+    raises=dict(
+        ValueError="If the folder is given as a URL, for which find_multiple_urls_by_fov is needed"
+    ),
     returns="Mapping from field of view to filepath",
     see_also=dict(
         find_single_path_by_fov="Similar function, for unique path by FOV, and particular extension",
+        find_multiple_urls_by_fov="Equivalent function for a remote folder (e.g., on object storage)",
         get_fov_sort_key="The function used to try to parse FOV from filename",
     ),
 )
 def find_multiple_paths_by_fov(  # noqa: D103
     folder: PathLike, *, extensions: Iterable[str]
 ) -> dict[FieldOfViewFrom1, list[Path]]:
-    if isinstance(folder, str):
-        folder = Path(folder)
+    if is_url(folder):
+        raise ValueError(f"Use find_multiple_urls_by_fov to find paths under URL: {folder}")
+    folder = to_local_path(folder)
     paths: dict[FieldOfViewFrom1, list[Path]] = {}
     for fn in os.listdir(folder):
         fp = folder / fn
@@ -104,19 +140,39 @@ def find_multiple_paths_by_fov(  # noqa: D103
         " of view embedded in filename."
     ),
     parameters=dict(
-        folder="Path to folder in which to find files",
+        folder="Path (or local URL, e.g. file:///data/experiment) of folder in which to find files",
         extension="The extension of files to find",
+        manifest="Manifest of the folder, to use instead of listing the folder unless it's stale",
+    ),
+    raises=dict(
+        RuntimeError="If the same FOV is found to correspond to more than one path",
+        ValueError="If the given manifest is for a different folder or extension, or the folder is a URL",
     ),
-    raises=dict(RuntimeError="If the same FOV is found to correspond to more than one path"),
     returns="Mapping from field of view to filepath",
     see_also=dict(
         find_multiple_paths_by_fov="Similar function, for multiple paths by FOV, no particular extension",
+        find_single_url_by_fov="Equivalent function for a remote folder (e.g., on object storage)",
         get_fov_sort_key="The function used to try to parse FOV from filename",
     ),
 )
-def find_single_path_by_fov(folder: PathLike, *, extension: str) -> dict[FieldOfViewFrom1, Path]:  # noqa: D103
-    if isinstance(folder, str):
-        folder = Path(folder)
+def find_single_path_by_fov(  # noqa: D103
+    folder: PathLike, *, extension: str, manifest: Optional["ExperimentManifest"] = None
+) -> dict[FieldOfViewFrom1, Path]:
+    if is_url(folder):
+        raise ValueError(f"Use find_single_url_by_fov to find paths under URL: {folder}")
+    folder = to_local_path(folder)
+    if manifest is not None:
+        if manifest.folder != folder.resolve() or manifest.extension != extension:
+            raise ValueError(
+                f"Manifest is for {manifest.extension} in {manifest.folder}, not {extension} in {folder}"
+            )
+        if not manifest.is_stale():
+            # Give paths under the folder as given, as listing the folder would.
+            return {
+                fov: folder / path.relative_to(manifest.folder)
+                for fov, path in manifest.paths_by_fov.items()
+            }
+        logging.warning("Manifest is stale, so listing folder: %s", folder)
     image_paths = {}
     for fn in os.listdir(folder):
         fp = folder / fn
@@ -0,0 +1,207 @@
+"""Persistent, content-keyed caching of pixel value statistics"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ._docs import doc
+from .geometry import ImagePoint3D
+from .pixel_value_statistics import Numeric, compute_pixel_statistics
+from .types import ImagingChannel, PathLike
+from .zarr_tools import compute_zarr_store_digest, read_zarr
+
+__all__ = ["PixelStatisticsCache"]
+
+# Bump this when the layout of a cache entry or the computation of the statistics changes.
+_CACHE_FORMAT_VERSION = 1
+_POINT_INDEX_KEY = "point_index"
+_COLUMN_NAMES_KEY = "column_names"
+_ENTRY_EXTENSION = ".npz"
+_DIGEST_EXTENSION = ".digest.json"
+
+SpotRecords = list[list[dict[str, Numeric]]]
+
+
+@doc(
+    summary="Cache, on local disk, the pixel value statistics for the spots of each field of view.",
+    extended_summary=(
+        "Each entry is keyed by a digest of the image store's content (metadata and chunks), "
+        "the spot coordinates, and the parameters of the computation, so that results are "
+        "reused exactly when the computation would produce the same values. Entries are "
+        "stored column-wise. Hashing a store reads every byte of it, so the digest is kept "
+        "in a record alongside an index of the store's files (relative path, size, and "
+        "modification time), and the store is hashed again only when that index changes; "
+        "a lookup with an unchanged store then costs one listing of its files. Once the total "
+        "size of the entries and digest records exceeds the cache's limit, the least recently "
+        "used of them are evicted."
+    ),
+    parameters=dict(
+        folder="Path to folder in which to store cache entries; created if needed",
+        max_bytes="Maximum total size of the cache entries",
+    ),
+    raises=dict(ValueError="If the maximum cache size isn't positive"),
+    see_also=dict(compute_pixel_statistics="The computation whose results are cached"),
+)
+class PixelStatisticsCache:  # noqa: D101
+    def __init__(self, folder: PathLike, *, max_bytes: int) -> None:  # noqa: D107
+        if max_bytes <= 0:
+            raise ValueError(f"Maximum cache size must be positive; got {max_bytes}")
+        self.folder: Path = Path(folder)
+        self.max_bytes = max_bytes
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def compute_for_store(  # noqa: PLR0913
+        self,
+        store: Path,
+        points: Sequence[ImagePoint3D],
+        *,
+        channels: Iterable[ImagingChannel],
+        diameter: int,
+        channel_column: str,
+    ) -> SpotRecords:
+        """Get pixel statistics for each point in the image in the given store, computing only if needed."""
+        channels = list(channels)
+        key = self._build_key(
+            store, points, channels=channels, diameter=diameter, channel_column=channel_column
+        )
+        cached = self._load(key, num_points=len(points))
+        if cached is not None:
+            logging.debug("Pixel statistics cache hit for store: %s", store)
+            return cached
+        logging.debug("Pixel statistics cache miss for store: %s", store)
+        img = np.asarray(read_zarr(store))
+        result: SpotRecords = [
+            compute_pixel_statistics(
+                img, pt, channels=channels, diameter=diameter, channel_column=channel_column
+            )
+            for pt in points
+        ]
+        self._store(key, result)
+        self._evict()
+        return result
+
+    def clear(self) -> None:
+        """Remove all entries from this cache."""
+        for entry in self._list_entries():
+            entry.unlink(missing_ok=True)
+        for record in self.folder.glob(f"*{_DIGEST_EXTENSION}"):
+            record.unlink(missing_ok=True)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.folder / (key + _ENTRY_EXTENSION)
+
+    def _list_entries(self) -> list[Path]:
+        return [p for p in self.folder.iterdir() if p.suffix == _ENTRY_EXTENSION]
+
+    def _build_key(  # noqa: PLR0913
+        self,
+        store: Path,
+        points: Sequence[ImagePoint3D],
+        *,
+        channels: list[ImagingChannel],
+        diameter: int,
+        channel_column: str,
+    ) -> str:
+        coordinates = np.array([(pt.x, pt.y, pt.z) for pt in points], dtype=np.float64)
+        spec = {
+            "version": _CACHE_FORMAT_VERSION,
+            "store": self._get_store_digest(store),
+            "points": hashlib.blake2b(coordinates.tobytes()).hexdigest(),
+            "channels": [ch.get for ch in channels],
+            "diameter": diameter,
+            "channel_column": channel_column,
+        }
+        return hashlib.blake2b(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    def _get_store_digest(self, store: Path) -> str:
+        record_path = self.folder / (
+            hashlib.blake2b(str(store.resolve()).encode()).hexdigest() + _DIGEST_EXTENSION
+        )
+        # Reuse the digest while the store's files keep their sizes and modification times.
+        index = _index_store_files(store)
+        try:
+            record = json.loads(record_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            record = None
+        if (
+            record is not None
+            and record["version"] == _CACHE_FORMAT_VERSION
+            and record["index"] == index
+        ):
+            with contextlib.suppress(FileNotFoundError):  # evicted concurrently
+                os.utime(record_path)  # Mark as recently used, for eviction.
+            return record["digest"]  # type: ignore[no-any-return]
+        logging.debug("Hashing content of store: %s", store)
+        digest = compute_zarr_store_digest(store)
+        record = {"version": _CACHE_FORMAT_VERSION, "index": index, "digest": digest}
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.folder, suffix=".tmp", delete=False
+        ) as tmp_file:
+            json.dump(record, tmp_file)
+        Path(tmp_file.name).replace(record_path)
+        self._evict()
+        return digest
+
+    def _load(self, key: str, *, num_points: int) -> Optional[SpotRecords]:
+        path = self._entry_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                names: list[str] = data[_COLUMN_NAMES_KEY].tolist()
+                point_index: list[int] = data[_POINT_INDEX_KEY].tolist()
+                columns = [data[f"column_{i}"].tolist() for i in range(len(names))]
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # Mark as recently used, for eviction.
+        result: SpotRecords = [[] for _ in range(num_points)]
+        for i, row in zip(point_index, zip(*columns, strict=True), strict=True):
+            result[i].append(dict(zip(names, row, strict=True)))
+        return result
+
+    def _store(self, key: str, result: SpotRecords) -> None:
+        rows = [(i, rec) for i, records in enumerate(result) for rec in records]
+        names: list[str] = list(rows[0][1].keys()) if rows else []
+        arrays = {
+            _COLUMN_NAMES_KEY: np.array(names, dtype=str),
+            _POINT_INDEX_KEY: np.array([i for i, _ in rows], dtype=np.int64),
+            **{f"column_{j}": np.array([rec[n] for _, rec in rows]) for j, n in enumerate(names)},
+        }
+        # Write to a temporary file and then move it, so that no reader sees a partial entry.
+        with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp_file:
+            np.savez(tmp_file, **arrays)
+        Path(tmp_file.name).replace(self._entry_path(key))
+
+    def _evict(self) -> None:
+        entries = []
+        for path in [*self._list_entries(), *self.folder.glob(f"*{_DIGEST_EXTENSION}")]:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # removed concurrently
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logging.debug("Evicting pixel statistics cache file: %s", path)
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _index_store_files(root: Path) -> list[list[object]]:
+    """List the relative path, size, and modification time of each file in the store, in a stable order."""
+    index: list[list[object]] = []
+    for folder, subfolders, filenames in os.walk(root):
+        subfolders.sort()
+        for fn in sorted(filenames):
+            fp = Path(folder) / fn
+            stat = fp.stat()
+            index.append([fp.relative_to(root).as_posix(), stat.st_size, stat.st_mtime_ns])
+    return index
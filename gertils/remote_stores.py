@@ -0,0 +1,196 @@
+"""Finding and reading ZARR datastores by URL, e.g. on object storage, by way of fsspec"""
+
+import hashlib
+import logging
+import os
+import posixpath
+import tempfile
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import fsspec  # type: ignore[import]
+import zarr  # type: ignore[import]
+
+from ._docs import doc
+from .pathtools import get_fov_sort_key
+from .types import FieldOfViewFrom1, PathLike, PixelArray
+from .zarr_tools import ZarrParseException
+
+__all__ = [
+    "DEFAULT_MAX_CONCURRENCY",
+    "fetch_zarr_store",
+    "find_multiple_urls_by_fov",
+    "find_single_url_by_fov",
+    "read_remote_zarr",
+]
+
+# Number of objects to fetch at once; object stores reward many small requests in flight.
+DEFAULT_MAX_CONCURRENCY = 16
+
+StorageOptions = Mapping[str, object]
+
+
+@doc(
+    summary="Directly under given URL, find the URL with given extension for each field of view.",
+    extended_summary=(
+        "The folder (or prefix, on object storage) is listed with a single call, rather than "
+        "with a request per entry."
+    ),
+    parameters=dict(
+        url="URL of the folder in which to find datastores, e.g. s3://bucket/experiment",
+        extension="The extension of datastores to find",
+        storage_options="Keyword arguments for the fsspec filesystem, e.g. credentials",
+    ),
+    raises=dict(RuntimeError="If the same FOV is found to correspond to more than one URL"),
+    returns="Mapping from field of view to URL",
+    see_also=dict(find_single_path_by_fov="The equivalent function for a local folder"),
+)
+def find_single_url_by_fov(  # noqa: D103
+    url: str, *, extension: str, storage_options: Optional[StorageOptions] = None
+) -> dict[FieldOfViewFrom1, str]:
+    urls = {}
+    for entry in _list_urls(url, storage_options=storage_options):
+        fov = get_fov_sort_key(entry, extension=extension)
+        if fov is not None:
+            if fov in urls:
+                raise RuntimeError(f"FOV {fov} already seen under URL! {url}")
+            urls[fov] = entry
+    return urls
+
+
+@doc(
+    summary="Directly under given URL, find all URLs with a field of view embedded in the name.",
+    parameters=dict(
+        url="URL of the folder in which to find files",
+        extensions="The file extensions to try to match",
+        storage_options="Keyword arguments for the fsspec filesystem, e.g. credentials",
+    ),
+    returns="Mapping from field of view to URLs",
+    see_also=dict(find_multiple_paths_by_fov="The equivalent function for a local folder"),
+)
+def find_multiple_urls_by_fov(  # noqa: D103
+    url: str, *, extensions: Iterable[str], storage_options: Optional[StorageOptions] = None
+) -> dict[FieldOfViewFrom1, list[str]]:
+    extensions = list(extensions)
+    urls: dict[FieldOfViewFrom1, list[str]] = {}
+    for entry in _list_urls(url, storage_options=storage_options):
+        for ext in extensions:
+            fov = get_fov_sort_key(entry, extension=ext)
+            if fov is not None:
+                urls.setdefault(fov, []).append(entry)
+                break
+    return urls
+
+
+@doc(
+    summary="Fetch every object of the array in a ZARR store, concurrently.",
+    extended_summary=(
+        "The store is listed once, recursively, to find both the data folder (as read_zarr "
+        "does locally) and every chunk, so no request is spent probing. The objects are then "
+        "fetched with at most the given number of requests in flight: in batches on the "
+        "event loop of an asynchronous filesystem (e.g., S3), otherwise on a pool of threads. "
+        "With a cache folder, only objects not yet cached are fetched (with the same bound), "
+        "and every object is then read from local disk."
+    ),
+    parameters=dict(
+        url="URL at which the datastore is rooted",
+        max_concurrency="Maximum number of objects to fetch at once",
+        cache_folder="Local folder in which to cache fetched objects, if any",
+        storage_options="Keyword arguments for the fsspec filesystem, e.g. credentials",
+    ),
+    raises=dict(ZarrParseException="If neither the root nor its 0 subfolder has a .zarray"),
+    returns="Mapping from key (path relative to the data folder) to content, usable as a ZARR store",
+)
+def fetch_zarr_store(  # noqa: D103
+    url: str,
+    *,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cache_folder: Optional[PathLike] = None,
+    storage_options: Optional[StorageOptions] = None,
+) -> dict[str, bytes]:
+    fs, root = fsspec.core.url_to_fs(url, **(storage_options or {}))
+    root = root.rstrip("/")
+    keys = [posixpath.relpath(p, root) for p in fs.find(root)]
+    if ".zarray" in keys:
+        data_root = root
+    elif posixpath.join("0", ".zarray") in keys:
+        data_root = posixpath.join(root, "0")
+    else:
+        raise ZarrParseException(
+            path=Path(url), msg="Failed to find .zarray to indicate data folder"
+        )
+    paths = [p for p in (posixpath.join(root, k) for k in keys) if p.startswith(data_root + "/")]
+    logging.debug("Fetching %d object(s) from ZARR: %s", len(paths), url)
+    if cache_folder is None:
+        contents = _fetch(fs, paths, max_concurrency=max_concurrency)
+    else:
+        contents = _fetch_through_cache(
+            fs, paths, cache_folder=Path(cache_folder), max_concurrency=max_concurrency
+        )
+    return {posixpath.relpath(p, data_root): content for p, content in contents.items()}
+
+
+@doc(
+    summary="Read data from ZARR rooted at given URL.",
+    parameters=dict(
+        url="URL at which the datastore is rooted",
+        max_concurrency="Maximum number of objects to fetch at once",
+        cache_folder="Local folder in which to cache fetched objects, if any",
+        storage_options="Keyword arguments for the fsspec filesystem, e.g. credentials",
+    ),
+    raises=dict(ZarrParseException="If neither the root nor its 0 subfolder has a .zarray"),
+    returns="Array of data stored",
+    see_also=dict(read_zarr="The equivalent function for a local path, which also accepts a URL"),
+)
+def read_remote_zarr(  # noqa: D103
+    url: str,
+    *,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cache_folder: Optional[PathLike] = None,
+    storage_options: Optional[StorageOptions] = None,
+) -> PixelArray:
+    store = fetch_zarr_store(
+        url,
+        max_concurrency=max_concurrency,
+        cache_folder=cache_folder,
+        storage_options=storage_options,
+    )
+    return zarr.open_array(store, mode="r")[:]  # type: ignore[no-any-return]
+
+
+def _fetch(  # type: ignore[no-any-unimported]
+    fs: "fsspec.AbstractFileSystem", paths: list[str], *, max_concurrency: int
+) -> dict[str, bytes]:
+    """Fetch the given objects, with at most the given number of requests in flight."""
+    if not paths:
+        return {}
+    if fs.async_impl:
+        return fs.cat(paths, batch_size=max_concurrency)  # type: ignore[no-any-return]
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        return dict(zip(paths, pool.map(fs.cat_file, paths), strict=True))
+
+
+def _fetch_through_cache(  # type: ignore[no-any-unimported]
+    fs: "fsspec.AbstractFileSystem", paths: list[str], *, cache_folder: Path, max_concurrency: int
+) -> dict[str, bytes]:
+    """Read the given objects from the local cache, first fetching (with bounded concurrency) those not yet cached."""
+    cache_folder.mkdir(parents=True, exist_ok=True)
+    cache_paths = {
+        p: cache_folder / hashlib.blake2b(fs.unstrip_protocol(p).encode("utf-8")).hexdigest()
+        for p in paths
+    }
+    missing = [p for p, cached in cache_paths.items() if not cached.is_file()]
+    for p, content in _fetch(fs, missing, max_concurrency=max_concurrency).items():
+        # Write atomically, so that a concurrent reader never sees a partial object.
+        fd, tmp = tempfile.mkstemp(dir=cache_folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        Path(tmp).replace(cache_paths[p])
+    return {p: cached.read_bytes() for p, cached in cache_paths.items()}
+
+
+def _list_urls(url: str, *, storage_options: Optional[StorageOptions]) -> list[str]:
+    fs, folder = fsspec.core.url_to_fs(url, **(storage_options or {}))
+    return [fs.unstrip_protocol(p) for p in fs.ls(folder, detail=False)]
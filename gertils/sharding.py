@@ -0,0 +1,220 @@
+"""Planning of balanced assignment of fields of view to shards of a batch job"""
+
+import argparse
+import dataclasses
+import heapq
+import json
+import logging
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Optional
+
+from ._docs import doc
+from .pathtools import find_single_path_by_fov
+from .types import FieldOfViewFrom1, PathLike
+
+__all__ = [
+    "ShardPlan",
+    "estimate_fov_costs",
+    "get_shard_index_from_environment",
+    "plan_shards",
+    "read_shard_plan",
+    "write_shard_plan",
+]
+
+DEFAULT_CHUNK_COST = 64 * 1024  # per-chunk overhead (open, decode), as equivalent bytes
+DEFAULT_SPOT_COST = 0  # per-spot cost, as equivalent bytes
+_FORMAT_VERSION = 1
+
+
+@doc(
+    summary="Assignment of fields of view to shards, with the estimated cost of each",
+    parameters=dict(
+        num_shards="Number of shards",
+        shard_by_fov="The shard (0-based index) to which each field of view is assigned",
+        cost_by_fov="Estimated cost of processing each field of view",
+    ),
+    raises=dict(
+        ValueError="If the number of shards isn't positive, or a shard index is out of range"
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class ShardPlan:  # noqa: D101
+    num_shards: int
+    shard_by_fov: Mapping[FieldOfViewFrom1, int]
+    cost_by_fov: Mapping[FieldOfViewFrom1, float]
+
+    def __post_init__(self) -> None:
+        if self.num_shards < 1:
+            raise ValueError(f"Number of shards must be positive; got {self.num_shards}")
+        bad = {fov.get: s for fov, s in self.shard_by_fov.items() if not 0 <= s < self.num_shards}
+        if bad:
+            raise ValueError(f"Shard index out of range for {self.num_shards} shard(s): {bad}")
+
+    def get_fovs(self, shard: int) -> list[FieldOfViewFrom1]:
+        """Get, in ascending order, the fields of view assigned to the given shard."""
+        if not 0 <= shard < self.num_shards:
+            raise ValueError(f"Shard index {shard} out of range for {self.num_shards} shard(s)")
+        return sorted(fov for fov, s in self.shard_by_fov.items() if s == shard)
+
+    def select_paths(
+        self, paths: Mapping[FieldOfViewFrom1, Path], *, shard: int
+    ) -> dict[FieldOfViewFrom1, Path]:
+        """Restrict a mapping from field of view to path to the given shard's fields of view."""
+        return {fov: paths[fov] for fov in self.get_fovs(shard)}
+
+    @property
+    def loads(self) -> list[float]:
+        """Total estimated cost of each shard"""
+        totals = [0.0] * self.num_shards
+        for fov, shard in self.shard_by_fov.items():
+            totals[shard] += self.cost_by_fov[fov]
+        return totals
+
+
+@doc(
+    summary="Estimate the cost of processing each field of view from its datastore on disk.",
+    extended_summary=(
+        "The cost is in units of bytes: the store's total size on disk, plus a fixed cost "
+        "for each chunk file (for opening and decoding it), plus a fixed cost for each spot."
+    ),
+    parameters=dict(
+        paths="Path to the datastore of each field of view, e.g. from find_single_path_by_fov",
+        spot_counts="Number of spots in each field of view, if known",
+        chunk_cost="Cost of each chunk file, as equivalent bytes",
+        spot_cost="Cost of each spot, as equivalent bytes",
+    ),
+    returns="Estimated cost for each field of view",
+)
+def estimate_fov_costs(  # noqa: D103
+    paths: Mapping[FieldOfViewFrom1, Path],
+    *,
+    spot_counts: Optional[Mapping[FieldOfViewFrom1, int]] = None,
+    chunk_cost: float = DEFAULT_CHUNK_COST,
+    spot_cost: float = DEFAULT_SPOT_COST,
+) -> dict[FieldOfViewFrom1, float]:
+    costs = {}
+    for fov, path in paths.items():
+        total_bytes, num_chunks = _measure_store(path)
+        num_spots = 0 if spot_counts is None else spot_counts.get(fov, 0)
+        costs[fov] = float(total_bytes + chunk_cost * num_chunks + spot_cost * num_spots)
+    return costs
+
+
+@doc(
+    summary="Assign fields of view to shards to balance the total cost per shard.",
+    extended_summary=(
+        "This is the longest-processing-time-first greedy schedule: fields of view are taken "
+        "in decreasing order of cost, and each goes to the currently least-loaded shard. "
+        "Ties are broken by field of view and by shard index, so the plan is deterministic."
+    ),
+    parameters=dict(
+        costs="Estimated cost of each field of view",
+        num_shards="Number of shards among which to divide the fields of view",
+    ),
+    raises=dict(ValueError="If the number of shards isn't positive"),
+    returns="The plan of shard assignments",
+)
+def plan_shards(costs: Mapping[FieldOfViewFrom1, float], *, num_shards: int) -> ShardPlan:  # noqa: D103
+    if num_shards < 1:
+        raise ValueError(f"Number of shards must be positive; got {num_shards}")
+    loads = [(0.0, shard) for shard in range(num_shards)]
+    heapq.heapify(loads)
+    shard_by_fov = {}
+    for fov, cost in sorted(costs.items(), key=lambda fov_cost: (-fov_cost[1], fov_cost[0])):
+        load, shard = heapq.heappop(loads)
+        shard_by_fov[fov] = shard
+        heapq.heappush(loads, (load + cost, shard))
+    return ShardPlan(num_shards=num_shards, shard_by_fov=shard_by_fov, cost_by_fov=dict(costs))
+
+
+@doc(
+    summary="Write a shard plan to a JSON file.",
+    parameters=dict(plan="The plan to write", path="Path to which to write"),
+    returns="Path to the file written",
+)
+def write_shard_plan(plan: ShardPlan, path: PathLike) -> Path:  # noqa: D103
+    path = Path(path)
+    data = {
+        "version": _FORMAT_VERSION,
+        "num_shards": plan.num_shards,
+        "assignments": [
+            {"fov": fov.get, "shard": shard, "cost": plan.cost_by_fov[fov]}
+            for fov, shard in sorted(plan.shard_by_fov.items())
+        ],
+    }
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return path
+
+
+@doc(
+    summary="Read a shard plan from a JSON file written by write_shard_plan.",
+    parameters=dict(path="Path to the plan file"),
+    raises=dict(ValueError="If the file's format version is unsupported"),
+    returns="The plan",
+)
+def read_shard_plan(path: PathLike) -> ShardPlan:  # noqa: D103
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard plan format version ({data.get('version')}): {path}")
+    assignments = [(FieldOfViewFrom1(a["fov"]), a["shard"], a["cost"]) for a in data["assignments"]]
+    return ShardPlan(
+        num_shards=data["num_shards"],
+        shard_by_fov={fov: shard for fov, shard, _ in assignments},
+        cost_by_fov={fov: cost for fov, _, cost in assignments},
+    )
+
+
+@doc(
+    summary="Get the current worker's shard index from an environment variable.",
+    parameters=dict(variable="Name of the environment variable, e.g. as set by an array job"),
+    raises=dict(
+        KeyError="If the environment variable isn't set",
+        ValueError="If the value of the environment variable isn't an integer",
+    ),
+    returns="The shard index",
+)
+def get_shard_index_from_environment(variable: str = "SLURM_ARRAY_TASK_ID") -> int:  # noqa: D103
+    try:
+        raw = os.environ[variable]
+    except KeyError as e:
+        raise KeyError(f"Environment variable for shard index isn't set: {variable}") from e
+    return int(raw)
+
+
+def _measure_store(path: Path) -> tuple[int, int]:
+    """Get the total size in bytes, and number of chunk files, of the store at given path."""
+    if path.is_file():
+        return path.stat().st_size, 1
+    total_bytes = 0
+    num_chunks = 0
+    for folder, _, filenames in os.walk(path):
+        for fn in filenames:
+            total_bytes += (Path(folder) / fn).stat().st_size
+            if not fn.startswith("."):  # ZARR metadata files (.zarray, .zattrs, etc.)
+                num_chunks += 1
+    return total_bytes, num_chunks
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Plan the sharding of the datastores in a folder, and write the plan."""
+    parser = argparse.ArgumentParser(
+        description="Write a cost-balanced plan of shards of the per-FOV datastores in a folder"
+    )
+    parser.add_argument("folder", type=Path, help="Folder in which to find datastores")
+    parser.add_argument("--num-shards", type=int, required=True, help="Number of shards")
+    parser.add_argument("--output", type=Path, required=True, help="Path to which to write plan")
+    parser.add_argument("--extension", default=".zarr", help="Extension of datastores")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    paths = find_single_path_by_fov(args.folder, extension=args.extension)
+    plan = plan_shards(estimate_fov_costs(paths), num_shards=args.num_shards)
+    write_shard_plan(plan, args.output)
+    logging.info(
+        "Wrote plan of %d shard(s) with loads %s: %s", plan.num_shards, plan.loads, args.output
+    )
+
+
+if __name__ == "__main__":
+    main()
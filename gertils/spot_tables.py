@@ -0,0 +1,249 @@
+"""Reading and writing spot tables in a binary, columnar, memory-mappable format"""
+
+import dataclasses
+import json
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Literal, Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from ._docs import doc
+from .geometry import ImagePoint3D
+from .types import (
+    FieldOfViewFrom1,
+    ImagingChannel,
+    NucleusNumber,
+    PathLike,
+    TimepointFrom0,
+    TraceIdFrom0,
+)
+
+__all__ = [
+    "SpotTable",
+    "SpotTableFormatException",
+    "read_spot_table",
+    "records_to_columns",
+    "write_spot_table",
+]
+
+WrapperType = Union[
+    type[FieldOfViewFrom1],
+    type[ImagingChannel],
+    type[NucleusNumber],
+    type[TimepointFrom0],
+    type[TraceIdFrom0],
+]
+
+# Least legal value of each integer wrapper type, for vectorized validation
+_WRAPPER_MINIMA: dict[WrapperType, int] = {
+    FieldOfViewFrom1: 1,
+    ImagingChannel: 0,
+    NucleusNumber: 1,
+    TimepointFrom0: 0,
+    TraceIdFrom0: 0,
+}
+_WRAPPERS_BY_NAME: dict[str, WrapperType] = {t.__name__: t for t in _WRAPPER_MINIMA}
+_SCHEMA_FILENAME = "schema.json"
+_FORMAT_VERSION = 1
+
+
+class SpotTableFormatException(Exception):
+    """Exception for when a folder doesn't hold a spot table in the expected format"""
+
+
+@doc(
+    summary="A table of spots, stored column-wise",
+    parameters=dict(
+        columns="Mapping from column name to the column's values",
+        column_types="Wrapper type of each column which holds wrapped integers",
+    ),
+)
+@dataclasses.dataclass(frozen=True)
+class SpotTable:  # noqa: D101
+    columns: dict[str, npt.NDArray[np.generic]]
+    column_types: dict[str, WrapperType] = dataclasses.field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def get_wrapped(self, column: str) -> list[object]:
+        """Wrap each value of a typed column as an instance of the column's type."""
+        wrap = self.column_types[column]
+        return [wrap(v) for v in self.columns[column].tolist()]
+
+    def to_points(self, *, x: str = "x", y: str = "y", z: str = "z") -> list[ImagePoint3D]:
+        """Create a point for each row, from the columns with coordinates."""
+        return [
+            ImagePoint3D(x=xi, y=yi, z=zi)
+            for xi, yi, zi in zip(
+                self.columns[x].astype(np.float64).tolist(),
+                self.columns[y].astype(np.float64).tolist(),
+                self.columns[z].astype(np.float64).tolist(),
+                strict=True,
+            )
+        ]
+
+
+@doc(
+    summary="Convert records (e.g., as from compute_pixel_statistics) into columns.",
+    parameters=dict(records="Records, each mapping the same keys to values"),
+    raises=dict(ValueError="If the records don't all have the same keys"),
+    returns="Mapping from key to array of values, in record order",
+)
+def records_to_columns(  # noqa: D103
+    records: Iterable[Mapping[str, object]],
+) -> dict[str, npt.NDArray[np.generic]]:
+    records = list(records)
+    if not records:
+        return {}
+    keys = list(records[0].keys())
+    for rec in records:
+        if list(rec.keys()) != keys:
+            raise ValueError(f"Record keys ({list(rec.keys())}) differ from first ({keys})")
+    return {k: np.array([rec[k] for rec in records]) for k in keys}
+
+
+@doc(
+    summary="Write a spot table as a folder of one binary file per column.",
+    extended_summary=(
+        "Rows are grouped by field of view, and the rows of each field of view are recorded "
+        "in the table's schema, so that a reader may load just its own fields of view."
+    ),
+    parameters=dict(
+        folder="Path to the folder to which to write; created if needed",
+        columns="Mapping from column name to the column's values",
+        column_types="Wrapper type of each column which holds wrapped integers",
+        fov_column="Name of the column with field of view, by which to group rows",
+    ),
+    raises=dict(
+        KeyError="If a column is given a type but isn't among the columns",
+        TypeError="If a column's values aren't of a primitive type, or a typed column doesn't hold integers",
+        ValueError="If columns differ in length, or a typed column holds a value out of its type's range",
+    ),
+    returns="Path to the folder written",
+)
+def write_spot_table(  # noqa: D103
+    folder: PathLike,
+    columns: Mapping[str, npt.ArrayLike],
+    *,
+    column_types: Optional[Mapping[str, WrapperType]] = None,
+    fov_column: Optional[str] = None,
+) -> Path:
+    folder = Path(folder)
+    column_types = dict(column_types or {})
+    if fov_column is not None:
+        column_types.setdefault(fov_column, FieldOfViewFrom1)
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    lengths = {name: len(arr) for name, arr in arrays.items()}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Columns differ in length: {lengths}")
+    untypable = [name for name, arr in arrays.items() if arr.dtype == object]
+    if untypable:
+        raise TypeError(f"Column(s) without values of a single primitive type: {untypable}")
+    untyped = [name for name in column_types if name not in arrays]
+    if untyped:
+        raise KeyError(f"Typed column(s) not in spot table: {', '.join(untyped)}")
+    for name, wrapper in column_types.items():
+        arrays[name] = _validate_typed_column(arrays[name], name=name, wrapper=wrapper)
+    fov_groups: dict[str, tuple[int, int]] = {}
+    if fov_column is not None:
+        order = np.argsort(arrays[fov_column], kind="stable")
+        arrays = {name: arr[order] for name, arr in arrays.items()}
+        fovs, starts, counts = np.unique(arrays[fov_column], return_index=True, return_counts=True)
+        fov_groups = {
+            str(fov): (start, start + n)
+            for fov, start, n in zip(fovs.tolist(), starts.tolist(), counts.tolist(), strict=True)
+        }
+    folder.mkdir(parents=True, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(folder / f"{name}.npy", arr)
+    schema = {
+        "version": _FORMAT_VERSION,
+        "columns": list(arrays.keys()),
+        "column_types": {name: wrapper.__name__ for name, wrapper in column_types.items()},
+        "fov_column": fov_column,
+        "fov_groups": fov_groups,
+    }
+    (folder / _SCHEMA_FILENAME).write_text(json.dumps(schema, indent=2), encoding="utf-8")
+    return folder
+
+
+@doc(
+    summary="Read a spot table written by write_spot_table.",
+    parameters=dict(
+        folder="Path to the folder in which the table is stored",
+        columns="Names of the columns to read; all columns if None",
+        fovs="Fields of view for which to read rows; all rows if None",
+        mmap="Whether to memory-map the column files, rather than read them fully",
+    ),
+    raises=dict(
+        SpotTableFormatException="If the folder doesn't hold a table of known format",
+        KeyError="If a requested column isn't in the table",
+        ValueError="If fields of view are requested from a table not grouped by field of view",
+    ),
+    returns="The table, with the requested columns and rows",
+    notes=(
+        "When memory-mapping and reading at most one field of view, "
+        "no column values are copied until they're used."
+    ),
+)
+def read_spot_table(  # noqa: D103
+    folder: PathLike,
+    *,
+    columns: Optional[Iterable[str]] = None,
+    fovs: Optional[Iterable[FieldOfViewFrom1]] = None,
+    mmap: bool = True,
+) -> SpotTable:
+    folder = Path(folder)
+    schema_path = folder / _SCHEMA_FILENAME
+    if not schema_path.is_file():
+        raise SpotTableFormatException(f"No spot table schema in folder: {folder}")
+    schema = json.loads(schema_path.read_text(encoding="utf-8"))
+    if schema.get("version") != _FORMAT_VERSION:
+        raise SpotTableFormatException(
+            f"Unsupported spot table format version ({schema.get('version')}) in folder: {folder}"
+        )
+    names: list[str] = schema["columns"] if columns is None else list(columns)
+    missing = [n for n in names if n not in schema["columns"]]
+    if missing:
+        raise KeyError(f"Column(s) not in spot table: {', '.join(missing)}")
+    mmap_mode: Optional[Literal["r"]] = "r" if mmap else None
+    data = {name: np.load(folder / f"{name}.npy", mmap_mode=mmap_mode) for name in names}
+    if fovs is not None:
+        if schema["fov_column"] is None:
+            raise ValueError(f"Spot table isn't grouped by field of view: {folder}")
+        groups = [schema["fov_groups"].get(str(fov.get)) for fov in fovs]
+        row_slices = [slice(*g) for g in groups if g is not None]
+        data = {
+            name: (
+                arr[row_slices[0]]
+                if len(row_slices) == 1
+                else np.concatenate([arr[s] for s in row_slices] or [arr[:0]])
+            )
+            for name, arr in data.items()
+        }
+    return SpotTable(
+        columns=data,
+        column_types={
+            name: _WRAPPERS_BY_NAME[type_name]
+            for name, type_name in schema["column_types"].items()
+            if name in data
+        },
+    )
+
+
+def _validate_typed_column(
+    arr: npt.NDArray[np.generic], *, name: str, wrapper: WrapperType
+) -> npt.NDArray[np.int64]:
+    if arr.size and not np.issubdtype(arr.dtype, np.integer):
+        raise TypeError(
+            f"Column {name} of {wrapper.__name__} values must hold integers, not {arr.dtype}"
+        )
+    least = _WRAPPER_MINIMA[wrapper]
+    if arr.size and arr.min() < least:
+        raise ValueError(
+            f"Column {name} of {wrapper.__name__} values must be at least {least}; got {arr.min()}"
+        )
+    return arr.astype(np.int64, copy=False)
@@ -0,0 +1,152 @@
+"""Extraction of the pixel windows around spots into one compact, persistable array"""
+
+import dataclasses
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+import numpy.typing as npt
+import zarr  # type: ignore[import]
+
+from ._docs import doc
+from .geometry import ImagePoint3D
+from .pixel_value_statistics import _get_central_z, _get_window_bounds
+from .types import ImagingChannel, PathLike
+
+__all__ = ["SpotWindows", "extract_spot_windows"]
+
+Padding = Literal["constant", "edge"]
+
+_ARRAY_NAMES = ("windows", "valid", "origins", "channels")
+
+
+@doc(
+    summary="The pixel windows around a collection of spots, stacked into one array.",
+    parameters=dict(
+        windows="Pixel values, with axes (spot, channel, z, y, x)",
+        valid="Whether each pixel, with axes (spot, z, y, x), was within the image rather than padding",
+        origins="Image coordinates (z, y, x) of the first pixel of each spot's window",
+        channels="The image channel of each index along the channel axis of the windows",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class SpotWindows:  # noqa: D101
+    windows: npt.NDArray[np.generic]
+    valid: npt.NDArray[np.bool_]
+    origins: npt.NDArray[np.int64]
+    channels: npt.NDArray[np.int64]
+
+    def to_npy_folder(self, folder: PathLike) -> Path:
+        """Write each array as .npy file in given folder, so that it may be memory-mapped when read."""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAY_NAMES:
+            np.save(folder / f"{name}.npy", getattr(self, name))
+        return folder
+
+    @classmethod
+    def from_npy_folder(cls, folder: PathLike, *, mmap: bool = True) -> "SpotWindows":
+        """Read windows written to given folder, memory-mapping the arrays by default."""
+        mmap_mode: Optional[Literal["r"]] = "r" if mmap else None
+        return cls(
+            **{
+                name: np.load(Path(folder) / f"{name}.npy", mmap_mode=mmap_mode)
+                for name in _ARRAY_NAMES
+            }
+        )
+
+    def to_zarr(self, root: PathLike, *, spots_per_chunk: int = 1024) -> Path:
+        """Write each array to a ZARR group, chunked along the spot axis."""
+        root = Path(root)
+        group = zarr.open_group(str(root), mode="w")
+        for name in _ARRAY_NAMES:
+            data = getattr(self, name)
+            chunks = (spots_per_chunk, *data.shape[1:]) if name != "channels" else data.shape
+            group.array(name, data, chunks=chunks)
+        return root
+
+    @classmethod
+    def from_zarr(cls, root: PathLike) -> "SpotWindows":
+        """Read windows from a ZARR group, lazily; arrays are read as they're indexed."""
+        group = zarr.open_group(str(root), mode="r")
+        return cls(**{name: group[name] for name in _ARRAY_NAMES})
+
+
+@doc(
+    summary="Extract the windows around spots, from multiple channels, into one array.",
+    extended_summary=(
+        "Each window spans the same pixels in y and x as the region used by "
+        "compute_pixel_statistics, but a window partially outside the image is padded to "
+        "full size rather than truncated, and a validity mask records which pixels are real."
+    ),
+    parameters=dict(
+        img="Image from which to extract windows, with axes (channel, z, y, x)",
+        points="Centers of windows to extract",
+        channels="Channels of image from which to extract windows",
+        diameter="Size (width and height) of window around each point",
+        plus_minus_planes="Number of z-slices to take on either side of each point's nearest slice; all z-slices if None",
+        padding="How to fill pixels outside the image: with the fill value, or with the nearest pixel",
+        fill_value="Value with which to pad, when padding is constant",
+    ),
+    raises=dict(
+        ValueError="If the image isn't 4D, a size parameter is negative, or a point is beyond the last z-slice"
+    ),
+    returns="Windows, validity mask, window origins, and channels",
+)
+def extract_spot_windows(  # noqa: D103, PLR0913
+    img: npt.NDArray[np.generic],
+    points: Sequence[ImagePoint3D],
+    *,
+    channels: Iterable[ImagingChannel],
+    diameter: int,
+    plus_minus_planes: Optional[int] = None,
+    padding: Padding = "constant",
+    fill_value: int = 0,
+) -> SpotWindows:
+    if len(img.shape) != 4:  # noqa: PLR2004
+        raise ValueError(f"Image must be 4D (channel, z, y, x), not {len(img.shape)}D")
+    if diameter < 1:
+        raise ValueError(f"Window diameter must be positive; got {diameter}")
+    if plus_minus_planes is not None and plus_minus_planes < 0:
+        raise ValueError(
+            f"Number of planes on either side of the central plane can't be negative; got {plus_minus_planes}"
+        )
+    if padding not in ("constant", "edge"):
+        raise ValueError(f"Unknown padding mode: {padding}")
+    img = np.asarray(img)
+    channel_indices = np.array([ch.get for ch in channels], dtype=np.int64)
+    _, num_z, height, width = img.shape
+    bounds = np.array(
+        [_get_window_bounds(pt, diameter=diameter)[::2] for pt in points], dtype=np.int64
+    ).reshape(-1, 2)  # (top, left) of each window
+    if plus_minus_planes is None:
+        z_starts = np.zeros(len(points), dtype=np.int64)
+        depth = num_z
+    else:
+        central_zs = [_get_central_z(pt.z, num_z=num_z) for pt in points]
+        z_starts = np.array(central_zs, dtype=np.int64) - plus_minus_planes
+        depth = 2 * plus_minus_planes + 1
+    zs = z_starts[:, None] + np.arange(depth)
+    ys = bounds[:, :1] + np.arange(diameter)
+    xs = bounds[:, 1:] + np.arange(diameter)
+    valid = (
+        ((zs >= 0) & (zs < num_z))[:, :, None, None]
+        & ((ys >= 0) & (ys < height))[:, None, :, None]
+        & ((xs >= 0) & (xs < width))[:, None, None, :]
+    )
+    # Gather with indices clipped into the image, which pads with the nearest pixel.
+    windows = img[
+        channel_indices[None, :, None, None, None],
+        np.clip(zs, 0, num_z - 1)[:, None, :, None, None],
+        np.clip(ys, 0, height - 1)[:, None, None, :, None],
+        np.clip(xs, 0, width - 1)[:, None, None, None, :],
+    ]
+    if padding == "constant":
+        windows[~np.broadcast_to(valid[:, None], windows.shape)] = fill_value
+    return SpotWindows(
+        windows=windows,
+        valid=valid,
+        origins=np.column_stack([z_starts, bounds]),
+        channels=channel_indices,
+    )
@@ -0,0 +1,189 @@
+"""Grouped aggregation of spot data by trace and by timepoint, over integer-coded columns"""
+
+import dataclasses
+from collections.abc import Mapping
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from ._docs import doc
+
+__all__ = [
+    "TimepointSummary",
+    "TraceSummary",
+    "summarize_by_timepoint",
+    "summarize_by_trace",
+]
+
+# When codes are no larger than this multiple of the number of rows, group by direct
+# addressing (bincount) rather than by sorting.
+_DENSE_CODES_FACTOR = 4
+
+IntArray = npt.NDArray[np.int64]
+FloatArray = npt.NDArray[np.float64]
+
+
+@doc(
+    summary="Per-trace summary of spot data.",
+    parameters=dict(
+        trace_ids="The distinct trace IDs, in ascending order",
+        counts="Number of rows for each trace",
+        means="For each value column, the mean value for each trace",
+        present_timepoints="Boolean matrix (trace, timepoint) indicating which timepoints each trace has",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class TraceSummary:  # noqa: D101
+    trace_ids: IntArray
+    counts: IntArray
+    means: dict[str, FloatArray]
+    present_timepoints: npt.NDArray[np.bool_]
+
+    @property
+    def missing_timepoint_counts(self) -> IntArray:
+        """Count, for each trace, the timepoints for which it has no rows."""
+        return (~self.present_timepoints).sum(axis=1)  # type: ignore[no-any-return]
+
+    def get_missing_timepoints(self, trace_id: int) -> IntArray:
+        """Get the timepoints for which the given trace has no rows."""
+        (index,) = np.flatnonzero(self.trace_ids == trace_id)
+        return np.flatnonzero(~self.present_timepoints[index])
+
+
+@doc(
+    summary="Per-timepoint summary of spot data.",
+    parameters=dict(
+        timepoints="The distinct timepoints, in ascending order",
+        counts="Number of rows for each timepoint",
+        trace_counts="Number of distinct traces with at least one row for each timepoint",
+        means="For each value column, the mean value for each timepoint",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class TimepointSummary:  # noqa: D101
+    timepoints: IntArray
+    counts: IntArray
+    trace_counts: IntArray
+    means: dict[str, FloatArray]
+
+
+@doc(
+    summary="Summarize spot data by trace, from integer-coded trace ID and timepoint columns.",
+    extended_summary=(
+        "The trace ID and timepoint columns hold the raw values which would be wrapped as "
+        "TraceIdFrom0 and TimepointFrom0; no wrapper object is ever created."
+    ),
+    parameters=dict(
+        trace_ids="The 0-based trace ID of each row",
+        timepoints="The 0-based timepoint of each row",
+        values="Named columns of values to average within each trace",
+        num_timepoints="Total number of timepoints; by default, one more than the greatest observed",
+    ),
+    raises=dict(
+        TypeError="If trace IDs or timepoints aren't integers",
+        ValueError="If trace IDs or timepoints are negative, or if columns' lengths differ",
+    ),
+    returns="Counts, means, and timepoint presence for each trace",
+)
+def summarize_by_trace(  # noqa: D103
+    trace_ids: npt.ArrayLike,
+    timepoints: npt.ArrayLike,
+    values: Mapping[str, npt.ArrayLike],
+    *,
+    num_timepoints: Optional[int] = None,
+) -> TraceSummary:
+    trace_codes = _as_codes(trace_ids, name="trace ID")
+    time_codes = _as_codes(timepoints, name="timepoint")
+    value_arrays = {name: np.asarray(col, dtype=np.float64) for name, col in values.items()}
+    _check_lengths({"trace IDs": trace_codes, "timepoints": time_codes, **value_arrays})
+    if num_timepoints is None:
+        num_timepoints = int(time_codes.max()) + 1 if time_codes.size else 0
+    elif time_codes.size and time_codes.max() >= num_timepoints:
+        raise ValueError(
+            f"Timepoint {time_codes.max()} is out of range for {num_timepoints} timepoint(s)"
+        )
+    unique_traces, inverse, counts = _group(trace_codes)
+    present = np.zeros((len(unique_traces), num_timepoints), dtype=bool)
+    present[inverse, time_codes] = True
+    return TraceSummary(
+        trace_ids=unique_traces,
+        counts=counts,
+        means=_group_means(value_arrays, inverse=inverse, counts=counts),
+        present_timepoints=present,
+    )
+
+
+@doc(
+    summary="Summarize spot data by timepoint, from integer-coded trace ID and timepoint columns.",
+    parameters=dict(
+        trace_ids="The 0-based trace ID of each row",
+        timepoints="The 0-based timepoint of each row",
+        values="Named columns of values to average within each timepoint",
+    ),
+    raises=dict(
+        TypeError="If trace IDs or timepoints aren't integers",
+        ValueError="If trace IDs or timepoints are negative, or if columns' lengths differ",
+    ),
+    returns="Counts of rows and of traces, and means, for each timepoint",
+)
+def summarize_by_timepoint(  # noqa: D103
+    trace_ids: npt.ArrayLike,
+    timepoints: npt.ArrayLike,
+    values: Mapping[str, npt.ArrayLike],
+) -> TimepointSummary:
+    trace_codes = _as_codes(trace_ids, name="trace ID")
+    time_codes = _as_codes(timepoints, name="timepoint")
+    value_arrays = {name: np.asarray(col, dtype=np.float64) for name, col in values.items()}
+    _check_lengths({"trace IDs": trace_codes, "timepoints": time_codes, **value_arrays})
+    unique_times, inverse, counts = _group(time_codes)
+    # Count distinct (timepoint, trace) pairs, per timepoint, encoding each pair as one integer.
+    num_trace_codes = int(trace_codes.max()) + 1 if trace_codes.size else 1
+    pairs = np.unique(inverse * num_trace_codes + trace_codes)
+    trace_counts = np.bincount(pairs // num_trace_codes, minlength=len(unique_times))
+    return TimepointSummary(
+        timepoints=unique_times,
+        counts=counts,
+        trace_counts=trace_counts,
+        means=_group_means(value_arrays, inverse=inverse, counts=counts),
+    )
+
+
+def _as_codes(raw: npt.ArrayLike, *, name: str) -> IntArray:
+    codes = np.asarray(raw)
+    if codes.ndim != 1:
+        raise ValueError(f"Column of {name} values must be 1D, not {codes.ndim}D")
+    if codes.size == 0:
+        return codes.astype(np.int64)
+    if not np.issubdtype(codes.dtype, np.integer):
+        raise TypeError(f"Non-integer {name} values (dtype {codes.dtype})")
+    if codes.min() < 0:
+        raise ValueError(f"Each {name} must be nonnegative; got {codes.min()}")
+    return codes.astype(np.int64, copy=False)
+
+
+def _check_lengths(columns: Mapping[str, npt.NDArray[np.generic]]) -> None:
+    lengths = {name: len(col) for name, col in columns.items()}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Columns differ in length: {lengths}")
+
+
+def _group(codes: IntArray) -> tuple[IntArray, IntArray, IntArray]:
+    """Find the distinct codes, the index of each row's group, and the size of each group."""
+    if codes.size and codes.max() < _DENSE_CODES_FACTOR * codes.size:
+        all_counts = np.bincount(codes)
+        unique = np.flatnonzero(all_counts)
+        group_of_code = np.zeros(len(all_counts), dtype=np.int64)
+        group_of_code[unique] = np.arange(len(unique))
+        return unique, group_of_code[codes], all_counts[unique]
+    unique, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+    return unique, inverse, counts
+
+
+def _group_means(
+    values: dict[str, FloatArray], *, inverse: IntArray, counts: IntArray
+) -> dict[str, FloatArray]:
+    return {
+        name: np.bincount(inverse, weights=column, minlength=len(counts)) / counts
+        for name, column in values.items()
+    }
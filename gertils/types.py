@@ -7,7 +7,8 @@ from typing import Union
 import dask.array as da
 import numpy as np
 import numpy.typing as npt
-from numpydoc_decorator import doc  # type: ignore[import]
+
+from ._docs import doc
 
 CsvRow = list[str]
 LayerParams = dict
@@ -1,30 +1,301 @@
 """Tools for working with ZARR"""
 
+import dataclasses
+import hashlib
+import itertools
 import logging
+import math
+import os
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
 
 import zarr  # type: ignore[import]
-from numpydoc_decorator import doc  # type: ignore[import]
 
+from ._docs import doc
+from .pathtools import is_url, to_local_path
 from .types import PixelArray
 
+if TYPE_CHECKING:
+    from .manifest import ExperimentManifest
+
 
 @doc(
-    summary="Read data from ZARR rooted at given path.",
+    summary="Find the folder in which a ZARR store's array data live, if present.",
     parameters=dict(root="Path at which datastore is rooted"),
+    returns="Path to folder with the .zarray file, either the root itself or its 0 subfolder; None if neither has one",
+)
+def get_zarr_data_root(root: Path) -> Optional[Path]:  # noqa: D103
+    if (root / ".zarray").is_file():
+        return root
+    if (root / "0" / ".zarray").is_file():
+        return root / "0"
+    return None
+
+
+@doc(
+    summary="Read data from ZARR rooted at given path.",
+    parameters=dict(
+        root="Path at which datastore is rooted, or fsspec URL (e.g., s3://bucket/P0001.zarr) of a remote store",
+        manifest="Manifest with the store's data folder, to use instead of probing the filesystem",
+    ),
     returns="Array of pixel (or similar) data",
+    see_also=dict(
+        read_remote_zarr="Reading of a remote store, with control of concurrency and caching"
+    ),
 )
-def read_zarr(root: Path) -> PixelArray:  # noqa: D103
+def read_zarr(  # noqa: D103
+    root: Union[Path, str], *, manifest: Optional["ExperimentManifest"] = None
+) -> PixelArray:
     logging.debug("Reading ZARR: %s", root)
-    if (root / ".zarray").is_file():
-        data_root = root
-    elif (root / "0" / ".zarray").is_file():
-        data_root = root / "0"
-    else:
+    if is_url(root):
+        from .remote_stores import read_remote_zarr
+
+        return read_remote_zarr(str(root))
+    root = to_local_path(root)
+    entry = None if manifest is None else manifest.get_entry_by_path(root)
+    data_root = get_zarr_data_root(root) if entry is None else entry.data_root
+    if data_root is None:
         raise ZarrParseException(path=root, msg="Failed to find .zarray to indicate data folder")
     return zarr.open(data_root)[:]  # type: ignore[no-any-return]
 
 
+@doc(
+    summary="Compute a digest of the full content of the ZARR store rooted at given path.",
+    extended_summary=(
+        "Each file in the store--metadata and chunks alike--contributes its path relative to "
+        "the root and the checksum of its bytes, so the digest changes whenever the stored "
+        "data or metadata change, but not when the store is moved."
+    ),
+    parameters=dict(root="Path at which datastore is rooted"),
+    returns="Hexadecimal digest of the store's content",
+)
+def compute_zarr_store_digest(root: Path) -> str:  # noqa: D103
+    digest = hashlib.blake2b()
+    for folder, subfolders, filenames in os.walk(root):
+        subfolders.sort()  # Make the traversal order deterministic.
+        for fn in sorted(filenames):
+            fp = Path(folder) / fn
+            digest.update(fp.relative_to(root).as_posix().encode())
+            digest.update(hashlib.blake2b(fp.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+# Cost of opening and decoding one chunk, beyond its bytes, as equivalent decoded bytes
+DEFAULT_CHUNK_OVERHEAD_BYTES = 64 * 1024
+
+Shape = tuple[int, ...]
+
+
+@doc(
+    summary="Estimate the bytes decoded to read a window at a random position in a chunked array.",
+    extended_summary=(
+        "Along an axis with chunk size c, a window of size w at a uniformly random offset "
+        "overlaps 1 + (w - 1) / c chunks on average (but never more than there are), and every "
+        "overlapped chunk is decoded in full."
+    ),
+    parameters=dict(
+        shape="Shape of the array",
+        chunks="Shape of each chunk of the array",
+        itemsize="Size in bytes of each array element",
+        window="Shape of the window read",
+    ),
+    returns="Expected number of bytes decoded per window",
+)
+def estimate_window_decode_bytes(  # noqa: D103
+    shape: Sequence[int], chunks: Sequence[int], *, itemsize: int, window: Sequence[int]
+) -> float:
+    _check_same_rank(shape=shape, chunks=chunks, window=window)
+    return float(math.prod(chunks)) * itemsize * _expected_chunks_per_window(shape, chunks, window)
+
+
+@doc(
+    summary="Choose the chunk shape that minimizes the expected cost of reading windows of given shape.",
+    extended_summary=(
+        "The cost of a window is the bytes decoded, plus a fixed overhead for each chunk touched. "
+        "Candidates for each axis are the window size, the full axis, and powers of 2 in between."
+    ),
+    parameters=dict(
+        shape="Shape of the array",
+        itemsize="Size in bytes of each array element",
+        window="Shape of the windows to read",
+        chunk_overhead_bytes="Cost of each chunk touched, as equivalent decoded bytes",
+        max_chunk_bytes="Maximum size in bytes of a chunk, if any",
+    ),
+    raises=dict(ValueError="If the shapes differ in rank, or no chunk is small enough"),
+    returns="The best chunk shape found",
+)
+def suggest_window_chunks(  # noqa: D103
+    shape: Sequence[int],
+    *,
+    itemsize: int,
+    window: Sequence[int],
+    chunk_overhead_bytes: float = DEFAULT_CHUNK_OVERHEAD_BYTES,
+    max_chunk_bytes: Optional[int] = None,
+) -> Shape:
+    _check_same_rank(shape=shape, window=window)
+    candidates_by_axis = []
+    for size, w in zip(shape, window, strict=True):
+        powers = {2**i for i in range(size.bit_length()) if 2**i <= size}
+        candidates_by_axis.append(sorted(powers | {min(w, size), size}))
+
+    def cost(chunks: Shape) -> float:
+        num_chunks = _expected_chunks_per_window(shape, chunks, window)
+        return num_chunks * (math.prod(chunks) * itemsize + chunk_overhead_bytes)
+
+    candidates = [
+        chunks
+        for chunks in itertools.product(*candidates_by_axis)
+        if max_chunk_bytes is None or math.prod(chunks) * itemsize <= max_chunk_bytes
+    ]
+    if not candidates:
+        raise ValueError(f"No chunk of {itemsize}-byte elements fits in {max_chunk_bytes} bytes")
+    # Ties go to larger chunks, which make for fewer files.
+    return min(candidates, key=lambda c: (cost(c), -math.prod(c)))
+
+
+@doc(
+    summary="Summary of a rechunking, with the expected cost of reading a window before and after",
+    parameters=dict(
+        source_chunks="Chunk shape of the source array",
+        target_chunks="Chunk shape of the rechunked array",
+        window="Shape of the window for which cost is estimated",
+        bytes_per_window_before="Expected bytes decoded per window from the source array",
+        bytes_per_window_after="Expected bytes decoded per window from the rechunked array",
+    ),
+)
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class RechunkReport:  # noqa: D101
+    source_chunks: Shape
+    target_chunks: Shape
+    window: Shape
+    bytes_per_window_before: float
+    bytes_per_window_after: float
+
+
+@doc(
+    summary="Copy a ZARR store to a new store with different chunking, within a memory budget.",
+    extended_summary=(
+        "The array is copied in blocks aligned to the new chunks, so that concurrent workers "
+        "never write the same chunk. Each block is as large as allowed by the memory budget "
+        "divided among the workers. The new store has its array metadata at its root, as "
+        "read_zarr expects, and keeps the source's compressor and attributes."
+    ),
+    parameters=dict(
+        source="Path at which the source datastore is rooted",
+        target="Path at which to create the rechunked datastore; must not exist",
+        window="Shape of the windows which will be read, e.g. (channels, z-slices, diameter, diameter)",
+        chunks="Chunk shape for the new store; if None, chosen by suggest_window_chunks within the per-worker budget",
+        memory_budget="Maximum bytes of array data to hold in memory at once, across workers",
+        max_workers="Number of threads to copy blocks concurrently",
+    ),
+    raises=dict(
+        ZarrParseException="If the source has no array metadata",
+        ValueError="If a shape has the wrong rank, or a single chunk exceeds the per-worker memory budget",
+    ),
+    returns="Summary of the chunking, with the expected bytes decoded per window before and after",
+)
+def rechunk_zarr(  # noqa: D103, PLR0913
+    source: Path,
+    target: Path,
+    *,
+    window: Sequence[int],
+    chunks: Optional[Sequence[int]] = None,
+    memory_budget: int = 1024**3,
+    max_workers: int = 4,
+) -> RechunkReport:
+    data_root = get_zarr_data_root(source)
+    if data_root is None:
+        raise ZarrParseException(path=source, msg="Failed to find .zarray to indicate data folder")
+    src = zarr.open_array(str(data_root), mode="r")
+    itemsize: int = src.dtype.itemsize
+    window = tuple(min(w, n) for w, n in zip(window, src.shape, strict=True))
+    worker_budget = memory_budget // max_workers
+    target_chunks: Shape = (
+        suggest_window_chunks(
+            src.shape, itemsize=itemsize, window=window, max_chunk_bytes=worker_budget
+        )
+        if chunks is None
+        else tuple(chunks)
+    )
+    _check_same_rank(shape=src.shape, chunks=target_chunks)
+    block = _grow_block(src.shape, target_chunks, itemsize=itemsize, max_bytes=worker_budget)
+    dst = zarr.open_array(
+        str(target),
+        mode="w-",
+        shape=src.shape,
+        chunks=target_chunks,
+        dtype=src.dtype,
+        compressor=src.compressor,
+        fill_value=src.fill_value,
+    )
+    dst.attrs.update(src.attrs.asdict())
+
+    def copy_block(start: Shape) -> None:
+        region = tuple(
+            slice(i, min(i + b, n)) for i, b, n in zip(start, block, src.shape, strict=True)
+        )
+        dst[region] = src[region]
+
+    starts = itertools.product(*(range(0, n, b) for n, b in zip(src.shape, block, strict=True)))
+    logging.debug(
+        "Rechunking %s to %s, %s -> %s, in blocks of %s",
+        source,
+        target,
+        src.chunks,
+        target_chunks,
+        block,
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for _ in pool.map(copy_block, starts):
+            pass
+    return RechunkReport(
+        source_chunks=tuple(src.chunks),
+        target_chunks=target_chunks,
+        window=window,
+        bytes_per_window_before=estimate_window_decode_bytes(
+            src.shape, src.chunks, itemsize=itemsize, window=window
+        ),
+        bytes_per_window_after=estimate_window_decode_bytes(
+            src.shape, target_chunks, itemsize=itemsize, window=window
+        ),
+    )
+
+
+def _check_same_rank(**shapes: Sequence[int]) -> None:
+    ranks = {name: len(shape) for name, shape in shapes.items()}
+    if len(set(ranks.values())) > 1:
+        raise ValueError(f"Shapes differ in number of dimensions: {ranks}")
+
+
+def _expected_chunks_per_window(
+    shape: Sequence[int], chunks: Sequence[int], window: Sequence[int]
+) -> float:
+    return math.prod(
+        min(1 + (w - 1) / c, math.ceil(n / c))
+        for n, c, w in zip(shape, chunks, window, strict=True)
+    )
+
+
+def _grow_block(shape: Shape, chunks: Shape, *, itemsize: int, max_bytes: int) -> Shape:
+    """Grow a block from a single chunk, by whole chunks from the last axis back, within a size limit."""
+    if math.prod(chunks) * itemsize > max_bytes:
+        raise ValueError(
+            f"Chunk of shape {chunks} exceeds memory budget per worker ({max_bytes} bytes)"
+        )
+    block = list(chunks)
+    for axis in reversed(range(len(shape))):
+        others = math.prod(block) // block[axis]
+        max_count = max(1, max_bytes // (others * chunks[axis] * itemsize))
+        block[axis] = min(
+            chunks[axis] * max_count, math.ceil(shape[axis] / chunks[axis]) * chunks[axis]
+        )
+        if block[axis] < shape[axis]:
+            break
+    return tuple(block)
+
+
 class ZarrParseException(Exception):
     """Exception for when something goes wrong parsing ZARR"""
 
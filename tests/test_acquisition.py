@@ -0,0 +1,88 @@
+"""Tests for following datastores as they appear during acquisition"""
+
+import os
+
+import pytest
+
+from gertils.acquisition import FovStoreReadyEvent, FovStoreWatcher
+from gertils.types import FieldOfViewFrom1
+
+
+def make_store(folder, name, *, ready, nested=False):
+    store = folder / name
+    data_root = store / "0" if nested else store
+    data_root.mkdir(parents=True)
+    if ready:
+        (data_root / ".zarray").write_text("{}", encoding="utf-8")
+    return store
+
+
+def test_stores_become_ready_only_once_zarray_exists(tmp_path):
+    store = make_store(tmp_path, "P0001.zarr", ready=False)
+    watcher = FovStoreWatcher(tmp_path)
+    assert watcher.poll() == []
+    assert watcher.pending_paths == {FieldOfViewFrom1(1): store}
+    (store / ".zarray").write_text("{}", encoding="utf-8")
+    assert watcher.poll() == [
+        FovStoreReadyEvent(fov=FieldOfViewFrom1(1), path=store, data_root=store)
+    ]
+    assert watcher.ready_paths == {FieldOfViewFrom1(1): store}
+    assert watcher.pending_paths == {}
+    # Each store is announced only once.
+    assert watcher.poll() == []
+
+
+def test_new_stores_are_picked_up_incrementally(tmp_path):
+    make_store(tmp_path, "P0001.zarr", ready=True)
+    make_store(tmp_path, "notes.txt", ready=False)
+    watcher = FovStoreWatcher(tmp_path)
+    assert [e.fov for e in watcher.poll()] == [FieldOfViewFrom1(1)]
+    store = make_store(tmp_path, "P0002.zarr", ready=True, nested=True)
+    assert watcher.poll() == [
+        FovStoreReadyEvent(fov=FieldOfViewFrom1(2), path=store, data_root=store / "0")
+    ]
+    assert set(watcher.ready_paths) == {FieldOfViewFrom1(1), FieldOfViewFrom1(2)}
+
+
+def test_folder_is_not_relisted_when_unchanged(tmp_path, monkeypatch):
+    make_store(tmp_path, "P0001.zarr", ready=True)
+    old_time = 1_000_000_000
+    os.utime(tmp_path, (old_time, old_time))
+    watcher = FovStoreWatcher(tmp_path)
+    watcher.poll()
+
+    def fail_listdir(_):
+        raise AssertionError("Folder should not be listed again")
+
+    monkeypatch.setattr(os, "listdir", fail_listdir)
+    assert watcher.poll() == []
+
+
+def test_removed_stores_leave_the_index(tmp_path):
+    store = make_store(tmp_path, "P0001.zarr", ready=True)
+    watcher = FovStoreWatcher(tmp_path)
+    watcher.poll()
+    (store / ".zarray").unlink()
+    store.rmdir()
+    assert watcher.poll() == []
+    assert watcher.ready_paths == {}
+
+
+def test_repeated_fov_is_an_error(tmp_path):
+    make_store(tmp_path, "P0001.zarr", ready=True)
+    make_store(tmp_path, "P001.zarr", ready=True)
+    with pytest.raises(RuntimeError):
+        FovStoreWatcher(tmp_path).poll()
+
+
+def test_watch_yields_events_until_stopped(tmp_path):
+    make_store(tmp_path, "P0001.zarr", ready=True)
+    make_store(tmp_path, "P0002.zarr", ready=True)
+    polls = []
+
+    def should_stop():
+        polls.append(None)
+        return len(polls) > 2  # noqa: PLR2004
+
+    events = list(FovStoreWatcher(tmp_path).watch(interval=0, should_stop=should_stop))
+    assert [e.fov.get for e in events] == [1, 2]
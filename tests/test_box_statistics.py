@@ -0,0 +1,87 @@
+"""Tests for constant-time box statistics via summed-volume tables"""
+
+import numpy as np
+import pytest
+
+from gertils.box_statistics import BOX_STATISTICS, BoxStatisticsEngine, compute_box_statistics
+from gertils.geometry import ImagePoint3D
+from gertils.pixel_value_statistics import compute_pixel_statistics
+from gertils.types import ImagingChannel
+
+IMG = np.random.default_rng(7).integers(0, 65536, size=(2, 6, 30, 25), dtype=np.uint16)
+CHANNELS = [ImagingChannel(0), ImagingChannel(1)]
+POINTS = [
+    ImagePoint3D(x=10.0, y=12.4, z=2.0),
+    ImagePoint3D(x=0.7, y=1.5, z=3.6),  # clipped in x and y
+    ImagePoint3D(x=24.5, y=29.9, z=5.0),  # clipped at far edges and at top in z
+    ImagePoint3D(x=12.5, y=20.0, z=5.8),  # central z rounded down to fit
+]
+
+
+@pytest.mark.parametrize("diameter", [1, 4, 7])
+def test_all_statistics_match_per_point_computation(diameter):
+    observed = compute_box_statistics(
+        IMG,
+        POINTS,
+        channels=CHANNELS,
+        diameter=diameter,
+        channel_column="channel",
+        statistics=BOX_STATISTICS,
+    )
+    for pt, obs_records in zip(POINTS, observed, strict=True):
+        expected = compute_pixel_statistics(
+            IMG, pt, channels=CHANNELS, diameter=diameter, channel_column="channel"
+        )
+        assert obs_records == [pytest.approx(rec) for rec in expected]
+
+
+def test_only_requested_statistics_are_computed():
+    (records,) = compute_box_statistics(
+        IMG, POINTS[:1], channels=CHANNELS[:1], diameter=3, channel_column="ch"
+    )
+    assert set(records[0]) == {
+        "ch",
+        "y_min_px",
+        "y_max_px",
+        "x_min_px",
+        "x_max_px",
+        "center_mean",
+        "center_sigma",
+    }
+
+
+def test_unknown_statistic_is_an_error():
+    with pytest.raises(ValueError, match="Unknown statistic"):
+        compute_box_statistics(
+            IMG, POINTS, channels=CHANNELS, diameter=3, channel_column="ch", statistics=["mode"]
+        )
+
+
+def test_box_moments_clip_to_image():
+    engine = BoxStatisticsEngine(IMG[0])
+    moments = engine.box_moments(z=([-2, 0], [3, 6]), y=([-5, 10], [4, 40]), x=([20, 0], [30, 25]))
+    expected_boxes = [IMG[0, 0:3, 0:4, 20:25], IMG[0, 0:6, 10:30, 0:25]]
+    assert moments.count.tolist() == [box.size for box in expected_boxes]
+    assert moments.total.tolist() == [int(box.astype(np.int64).sum()) for box in expected_boxes]
+    assert moments.mean == pytest.approx([box.mean() for box in expected_boxes])
+    assert moments.sigma == pytest.approx([box.std() for box in expected_boxes])
+
+
+def test_annulus_excludes_inner_window():
+    engine = BoxStatisticsEngine(IMG[1])
+    pt = ImagePoint3D(x=12.0, y=14.0, z=3.0)
+    moments = engine.annulus_moments([pt], inner_diameter=3, outer_diameter=9)
+    mask = np.zeros(IMG.shape[2:], dtype=bool)
+    outer_top, outer_left = round(pt.y - 4.5), round(pt.x - 4.5)
+    inner_top, inner_left = round(pt.y - 1.5), round(pt.x - 1.5)
+    mask[outer_top : outer_top + 9, outer_left : outer_left + 9] = True
+    mask[inner_top : inner_top + 3, inner_left : inner_left + 3] = False
+    values = IMG[1, 2:5][:, mask]
+    assert moments.count.tolist() == [values.size]
+    assert moments.mean == pytest.approx([values.mean()])
+    assert moments.sigma == pytest.approx([values.std()])
+
+
+def test_engine_requires_3d_image():
+    with pytest.raises(ValueError, match="Image must be 3D"):
+        BoxStatisticsEngine(IMG)
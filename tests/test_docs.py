@@ -0,0 +1,43 @@
+"""Tests for the attachment (or skipping) of rendered docstrings"""
+
+import pytest
+
+from gertils import _docs
+
+
+@pytest.mark.parametrize(
+    ("env_value", "expected"),
+    [
+        ("", False),
+        ("0", False),
+        ("no", False),
+        ("1", True),
+        ("true", True),
+        (" Yes ", True),
+    ],
+)
+def test_docstrings_are_skipped__reflects_environment(monkeypatch, env_value, expected):
+    monkeypatch.setenv(_docs.SKIP_DOCSTRINGS_ENV_VAR, env_value)
+    assert _docs.docstrings_are_skipped() == expected
+
+
+def test_doc__renders_docstring_by_default(monkeypatch):
+    monkeypatch.setattr(_docs, "_SKIP_DOCSTRINGS", False)
+
+    @_docs.doc(summary="Add one to a number.", parameters=dict(x="Number to increment"))
+    def incr(x: int) -> int:
+        return x + 1
+
+    assert incr.__doc__.strip().startswith("Add one to a number.")
+    assert "Number to increment" in incr.__doc__
+
+
+def test_doc__leaves_member_unchanged_when_skipping(monkeypatch):
+    monkeypatch.setattr(_docs, "_SKIP_DOCSTRINGS", True)
+
+    def incr(x: int) -> int:
+        return x + 1
+
+    # Even an undocumented parameter doesn't matter, since nothing is rendered.
+    assert _docs.doc(summary="Add one to a number.")(incr) is incr
+    assert incr.__doc__ is None
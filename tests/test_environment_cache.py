@@ -0,0 +1,166 @@
+"""Tests for the hashing, batched reading, and caching of built environments"""
+
+import multiprocessing
+import time
+
+import pytest
+
+from gertils import environment_cache
+from gertils.environment_cache import EnvironmentBuildCache
+from gertils.environments import (
+    CondaEnvironmentSpecification,
+    PipEnvironmentSpecification,
+    RepeatedEnvironmentElementException,
+    combine_pip_environments,
+    compute_environment_hash,
+    read_pip_env_file,
+    read_pip_env_files,
+)
+
+
+def pip_env(*deps, name=None):
+    return PipEnvironmentSpecification(dependencies=list(deps), name=name)
+
+
+def conda_env(*, channels=("conda-forge", "defaults"), conda=("numpy",), pip=()):
+    return CondaEnvironmentSpecification(
+        python_spec="python=3.11",
+        channels=list(channels),
+        conda_dependencies=list(conda),
+        pip_dependencies=list(pip),
+        name=None,
+    )
+
+
+def test_hash_ignores_order_whitespace_name_and_spelling_of_package_names():
+    first = pip_env("numpy>=1.24", "Typing_Extensions", "zarr", name="a")
+    second = pip_env("zarr", "typing-extensions", "numpy >= 1.24", name="b")
+    assert compute_environment_hash(first) == compute_environment_hash(second)
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    [
+        (pip_env("numpy>=1.24"), pip_env("numpy>=1.25")),
+        (pip_env("numpy"), pip_env("numpy", "zarr")),
+        (pip_env("numpy"), conda_env(conda=(), pip=("numpy",))),
+        (conda_env(), conda_env(channels=("defaults", "conda-forge"))),
+        (conda_env(conda=("typing_extensions",)), conda_env(conda=("typing-extensions",))),
+    ],
+)
+def test_hash_distinguishes_different_environments(first, second):
+    assert compute_environment_hash(first) != compute_environment_hash(second)
+
+
+def test_hash_is_short_enough_to_name_an_environment_prefix(tmp_path):
+    env = conda_env()
+    assert len(compute_environment_hash(env)) == 32  # noqa: PLR2004
+    prefix = EnvironmentBuildCache(tmp_path, max_entries=1).get_prefix(env)
+    assert prefix.name == compute_environment_hash(env)
+
+
+def test_batched_read_matches_combining_single_reads(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"requirements{i}.txt"
+        path.write_text(f"common\npkg{i}\n\npkg{i % 3}x\n")
+        paths.append(path)
+    expected = combine_pip_environments(*(read_pip_env_file(p) for p in paths))
+    assert read_pip_env_files(paths) == expected
+
+
+def test_batched_read_rejects_repeats_within_a_file(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("numpy\nnumpy\n")
+    with pytest.raises(RepeatedEnvironmentElementException, match="requirements.txt"):
+        read_pip_env_files([path])
+
+
+def write_marker_build(prefix):
+    prefix.mkdir()
+    (prefix / "built").write_text(str(time.monotonic_ns()))
+
+
+def test_matching_spec_reuses_build(tmp_path):
+    cache = EnvironmentBuildCache(tmp_path, max_entries=2)
+    builds = []
+
+    def build(prefix):
+        builds.append(prefix)
+        write_marker_build(prefix)
+
+    with cache.acquire(pip_env("numpy", "zarr"), build=build) as first:
+        assert (first / "built").is_file()
+    with cache.acquire(pip_env("zarr", "numpy"), build=build) as second:
+        assert second == first
+    assert builds == [first]
+    assert cache.is_built(pip_env("numpy", "zarr"))
+
+
+def test_failed_build_is_cleaned_and_retried(tmp_path):
+    cache = EnvironmentBuildCache(tmp_path, max_entries=2)
+    env = pip_env("numpy")
+
+    def failing_build(prefix):
+        prefix.mkdir()
+        raise RuntimeError("build failed")
+
+    with pytest.raises(RuntimeError, match="build failed"), cache.acquire(env, build=failing_build):
+        pass
+    assert not cache.get_prefix(env).exists()
+    assert not cache.is_built(env)
+    with cache.acquire(env, build=write_marker_build) as prefix:
+        assert (prefix / "built").is_file()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EnvironmentBuildCache(tmp_path, max_entries=2)
+    envs = [pip_env(f"pkg{i}") for i in range(3)]
+    for env in envs[:2]:
+        with cache.acquire(env, build=write_marker_build):
+            pass
+    time.sleep(0.01)
+    with cache.acquire(envs[0], build=write_marker_build):
+        pass
+    with cache.acquire(envs[2], build=write_marker_build):
+        pass
+    assert [cache.is_built(env) for env in envs] == [True, False, True]
+    assert not cache.get_prefix(envs[1]).exists()
+
+
+def test_environment_in_use_is_not_evicted(tmp_path):
+    cache = EnvironmentBuildCache(tmp_path, max_entries=1)
+    with cache.acquire(pip_env("old"), build=write_marker_build) as in_use:
+        time.sleep(0.01)
+        with cache.acquire(pip_env("new"), build=write_marker_build):
+            pass
+        assert (in_use / "built").is_file()
+    with cache.acquire(pip_env("newer"), build=write_marker_build):
+        pass
+    assert not in_use.exists()
+
+
+def build_in_other_process(folder, dep):
+    cache = EnvironmentBuildCache(folder, max_entries=4)
+
+    def slow_build(prefix):
+        time.sleep(0.2)
+        write_marker_build(prefix)
+        with (folder / "build_count").open("a") as fh:
+            fh.write("1")
+
+    with cache.acquire(pip_env(dep), build=slow_build) as prefix:
+        return (prefix / "built").read_text()
+
+
+def test_concurrent_jobs_build_once(tmp_path):
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        results = pool.starmap(build_in_other_process, [(tmp_path, "numpy")] * 4)
+    assert len(set(results)) == 1
+    assert (tmp_path / "build_count").read_text() == "1"
+
+
+def test_cache_without_flock_is_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(environment_cache, "_HAVE_FLOCK", False)
+    with pytest.raises(RuntimeError, match="requires POSIX file locking"):
+        EnvironmentBuildCache(tmp_path, max_entries=1)
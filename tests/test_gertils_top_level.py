@@ -17,7 +17,15 @@ PATHTOOLS_PUBLIC_MEMBERS = [
 @pytest.mark.parametrize(
     ("member_name", "expected_presence"),
     [(name, True) for name in PATHTOOLS_PUBLIC_MEMBERS]
-    + [(name, True) for name in ["RegionalPixelStatistics", "compute_pixel_statistics"]]
+    + [
+        (name, True)
+        for name in [
+            "NucleusPixelStatistics",
+            "RegionalPixelStatistics",
+            "compute_pixel_statistics",
+            "compute_pixel_statistics_by_nucleus",
+        ]
+    ]
     + [(name, False) for name in envs_module.__all__ + COLLECTIONS_PUBLIC_MEMBERS],
 )
 def test_import_visibility(member_name, expected_presence):
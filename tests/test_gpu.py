@@ -1,12 +1,107 @@
 """Tests for the GPU tools"""
 
+import sys
+
 import pytest
 
+from gertils.gpu import (
+    CUDA_VISIBLE_DEVICES_ENV_VAR,
+    GpuInventory,
+    count_gpus,
+    detect_gpus,
+    get_gpu_inventory,
+    list_tensorflow_gpus,
+)
 
-def test_no_tensorflow__causes_module_not_found_error_on_gpu_import():
-    with pytest.raises(ModuleNotFoundError):
-        import gertils.gpu
+PCI_BUS_IDS = ["0000:3b:00.0", "0000:5e:00.0", "0000:86:00.0", "0000:af:00.0"]
+
+
+@pytest.fixture()
+def proc_folder(tmp_path):
+    folder = tmp_path / "proc" / "driver" / "nvidia"
+    for bus_id in PCI_BUS_IDS:
+        (folder / "gpus" / bus_id).mkdir(parents=True)
+    return folder
+
+
+@pytest.fixture()
+def dev_folder(tmp_path):
+    folder = tmp_path / "dev"
+    folder.mkdir()
+    for name in ["nvidia1", "nvidia0", "nvidiactl", "nvidia-uvm", "nvidia10", "null"]:
+        (folder / name).touch()
+    return folder
+
+
+@pytest.fixture()
+def no_gpu_folders(tmp_path):
+    return {"proc_folder": tmp_path / "no_proc", "dev_folder": tmp_path / "no_dev"}
+
+
+@pytest.fixture()
+def _clear_inventory_cache():
+    get_gpu_inventory.cache_clear()
+    yield
+    get_gpu_inventory.cache_clear()
+
+
+def test_import_does_not_import_tensorflow():
+    assert "tensorflow" not in sys.modules
+
+
+def test_gpus_from_driver_listing(proc_folder, dev_folder):
+    inventory = detect_gpus(environ={}, proc_folder=proc_folder, dev_folder=dev_folder)
+    assert inventory.devices == tuple(PCI_BUS_IDS)
+    assert inventory.source == str(proc_folder / "gpus")
+
+
+def test_gpus_from_device_files_without_driver_listing(tmp_path, dev_folder):
+    inventory = detect_gpus(environ={}, proc_folder=tmp_path / "no_proc", dev_folder=dev_folder)
+    assert inventory.devices == ("nvidia0", "nvidia1", "nvidia10")
+    assert inventory.count == 3  # noqa: PLR2004
+
+
+def test_no_gpus(no_gpu_folders):
+    inventory = detect_gpus(environ={CUDA_VISIBLE_DEVICES_ENV_VAR: "0,1"}, **no_gpu_folders)
+    assert inventory == GpuInventory(devices=(), source="none")
+
+
+@pytest.mark.parametrize(
+    ("visible", "expected"),
+    [
+        ("0,2", ("0", "2")),
+        (" 3 , 1 ", ("3", "1")),
+        ("", ()),
+        ("-1", ()),
+        ("NoDevFiles", ()),
+        ("1,7,2", ("1",)),
+        ("1,bogus,2", ("1",)),
+        (
+            "GPU-5b8d6a5e-0f1c-4b8e-9d37-0a6c1d2e3f40,0",
+            ("GPU-5b8d6a5e-0f1c-4b8e-9d37-0a6c1d2e3f40", "0"),
+        ),
+    ],
+)
+def test_cuda_visible_devices_restricts_gpus(proc_folder, dev_folder, visible, expected):
+    inventory = detect_gpus(
+        environ={CUDA_VISIBLE_DEVICES_ENV_VAR: visible},
+        proc_folder=proc_folder,
+        dev_folder=dev_folder,
+    )
+    assert inventory.devices == expected
+    assert inventory.source == CUDA_VISIBLE_DEVICES_ENV_VAR
+
+
+@pytest.mark.usefixtures("_clear_inventory_cache")
+def test_inventory_is_cached_for_process(monkeypatch):
+    monkeypatch.setenv(CUDA_VISIBLE_DEVICES_ENV_VAR, "")
+    first = get_gpu_inventory()
+    monkeypatch.setenv(CUDA_VISIBLE_DEVICES_ENV_VAR, "0")
+    assert get_gpu_inventory() is first
+    get_gpu_inventory.cache_clear()
+    assert count_gpus() == detect_gpus().count
+
+
+def test_no_tensorflow__causes_module_not_found_error_only_when_requested():
     with pytest.raises(ModuleNotFoundError):
-        from gertils import gpu  # noqa: F401
-    # Does not raise an exception.
-    import gertils  # noqa: F401
+        list_tensorflow_gpus()
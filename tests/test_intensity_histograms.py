@@ -0,0 +1,133 @@
+"""Tests for streaming histograms of pixel intensity"""
+
+import collections
+from pathlib import Path
+
+import numpy as np
+import pytest
+import zarr  # type: ignore[import]
+
+from gertils import intensity_histograms
+from gertils.intensity_histograms import IntensityHistogram, compute_channel_histograms
+from gertils.types import ImagingChannel
+from gertils.zarr_tools import ZarrParseException
+
+
+def write_store(folder, name, data, *, chunks):
+    root = folder / name
+    zarr.open_group(str(root), mode="w").array("0", data, chunks=chunks)
+    return root
+
+
+@pytest.fixture()
+def stores_and_data(tmp_path):
+    rng = np.random.default_rng(0)
+    data = [
+        rng.integers(0, 4096, size=(3, 4, 30, 20), dtype=np.uint16),
+        rng.integers(60000, 65536, size=(3, 2, 17, 25), dtype=np.uint16),
+    ]
+    paths = [
+        write_store(tmp_path, f"P{i:04}.zarr", d, chunks=(1, 1, 8, 8))
+        for i, d in enumerate(data, start=1)
+    ]
+    return paths, data
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_merged_histograms_match_concatenated_pixels(stores_and_data, max_workers):
+    paths, data = stores_and_data
+    channels = [ImagingChannel(0), ImagingChannel(2)]
+    histograms = compute_channel_histograms(paths, channels=channels, max_workers=max_workers)
+    assert list(histograms) == channels
+    for ch, hist in histograms.items():
+        pixels = np.concatenate([d[ch.get].ravel() for d in data])
+        assert np.array_equal(hist.counts, IntensityHistogram.from_values(pixels).counts)
+        assert hist.total == pixels.size
+        assert hist.mean == pytest.approx(pixels.mean())
+        assert hist.std == pytest.approx(pixels.std())
+        qs = [0, 0.01, 0.5, 0.99, 1]
+        assert hist.quantile(qs) == np.quantile(pixels, qs, method="inverted_cdf").tolist()
+
+
+def test_stores_are_opened_and_partials_merged_as_work_proceeds(stores_and_data, monkeypatch):
+    paths, _ = stores_and_data
+    events = []
+    open_pixel_array = intensity_histograms._open_pixel_array  # noqa: SLF001
+    count_store = intensity_histograms._count_store  # noqa: SLF001
+
+    def recording_open(path):
+        events.append("open")
+        return open_pixel_array(path)
+
+    def recording_count(arr, channels):
+        events.append("count")
+        return count_store(arr, channels)
+
+    monkeypatch.setattr(intensity_histograms, "_open_pixel_array", recording_open)
+    monkeypatch.setattr(intensity_histograms, "_count_store", recording_count)
+    compute_channel_histograms(iter(paths), channels=[ImagingChannel(0)], max_workers=1)
+    assert events == ["open", "count", "open", "count"]
+
+
+class ReadCountingStore(dict):
+    """In-memory ZARR store which counts the reads of each key"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = collections.Counter()
+
+    def __getitem__(self, key):
+        self.reads[key] += 1
+        return super().__getitem__(key)
+
+
+def test_chunk_holding_many_channels_is_read_once(monkeypatch):
+    data = np.random.default_rng(0).integers(0, 4096, size=(3, 2, 10, 10), dtype=np.uint16)
+    store = ReadCountingStore()
+    zarr.save_array(store, data, chunks=(3, 1, 5, 5))
+    monkeypatch.setattr(
+        intensity_histograms, "_open_pixel_array", lambda _: zarr.open_array(store, mode="r")
+    )
+    channels = [ImagingChannel(0), ImagingChannel(2)]
+    histograms = compute_channel_histograms([Path("P0001.zarr")], channels=channels)
+    for ch, hist in histograms.items():
+        assert np.array_equal(hist.counts, IntensityHistogram.from_values(data[ch.get]).counts)
+    chunk_reads = {k: n for k, n in store.reads.items() if not k.startswith(".")}
+    assert len(chunk_reads) == 2 * 2 * 2
+    assert set(chunk_reads.values()) == {1}
+
+
+def test_histograms_merge_by_addition():
+    values = np.array([0, 1, 1, 65535], dtype=np.uint16)
+    whole = IntensityHistogram.from_values(values)
+    parts = IntensityHistogram.from_values(values[:2]) + IntensityHistogram.from_values(values[2:])
+    assert np.array_equal(parts.counts, whole.counts)
+    assert whole.quantile(0.5) == 1
+    assert whole.quantile(1) == 65535  # noqa: PLR2004
+
+
+def test_empty_histogram():
+    hist = IntensityHistogram.empty()
+    assert hist.total == 0
+    assert np.isnan(hist.mean)
+    with pytest.raises(ValueError, match="empty"):
+        hist.quantile(0.5)
+
+
+def test_quantile_out_of_range_is_error():
+    hist = IntensityHistogram.from_values(np.arange(10, dtype=np.uint8))
+    with pytest.raises(ValueError, match="must be in"):
+        hist.quantile(1.5)
+
+
+@pytest.mark.parametrize("dtype", [np.int16, np.uint32, np.float32])
+def test_non_pixel_dtype_is_error(tmp_path, dtype):
+    path = write_store(tmp_path, "P0001.zarr", np.zeros((1, 1, 4, 4), dtype=dtype), chunks=None)
+    with pytest.raises(ValueError, match="unsigned integers"):
+        compute_channel_histograms([path], channels=[ImagingChannel(0)])
+
+
+def test_store_without_array_is_error(tmp_path):
+    (tmp_path / "P0001.zarr").mkdir()
+    with pytest.raises(ZarrParseException):
+        compute_channel_histograms([tmp_path / "P0001.zarr"], channels=[ImagingChannel(0)])
@@ -0,0 +1,135 @@
+"""Tests for the consolidated manifest of an experiment's datastores"""
+
+import os
+
+import numpy as np
+import pytest
+import zarr  # type: ignore[import]
+
+from gertils import zarr_tools
+from gertils.manifest import (
+    DEFAULT_MANIFEST_FILENAME,
+    build_manifest,
+    main,
+    read_manifest,
+    write_manifest,
+)
+from gertils.pathtools import find_single_path_by_fov
+from gertils.types import FieldOfViewFrom1
+from gertils.zarr_tools import read_zarr
+
+
+@pytest.fixture()
+def experiment(tmp_path):
+    folder = tmp_path / "experiment"
+    folder.mkdir()
+    zarr.save_array(
+        str(folder / "P0001.zarr"), np.zeros((2, 3, 8, 8), dtype=np.uint16), chunks=(1, 1, 8, 8)
+    )
+    zarr.save_array(str(folder / "P0002.zarr" / "0"), np.ones((4, 4), dtype=np.uint8))
+    settle_folder(folder)
+    return folder
+
+
+def settle_folder(folder):
+    old_time = 1_000_000_000
+    os.utime(folder, (old_time, old_time))
+
+
+def test_manifest_records_store_metadata(experiment):
+    manifest = build_manifest(experiment)
+    assert set(manifest.entries) == {FieldOfViewFrom1(1), FieldOfViewFrom1(2)}
+    first = manifest.entries[FieldOfViewFrom1(1)]
+    assert first.data_root == experiment / "P0001.zarr"
+    assert first.shape == (2, 3, 8, 8)
+    assert first.chunks == (1, 1, 8, 8)
+    assert first.dtype == "<u2"
+    assert manifest.entries[FieldOfViewFrom1(2)].data_root == experiment / "P0002.zarr" / "0"
+
+
+def test_roundtrip_inside_folder_is_not_stale(experiment):
+    manifest = build_manifest(experiment)
+    path, _ = write_manifest(manifest)
+    assert path == experiment / DEFAULT_MANIFEST_FILENAME
+    loaded = read_manifest(path)
+    assert loaded.entries == manifest.entries
+    assert not loaded.is_stale(check_stores=True)
+
+
+def test_written_manifest_is_not_stale(experiment):
+    _, manifest = write_manifest(build_manifest(experiment))
+    assert not manifest.is_stale()
+
+
+def test_new_store_makes_manifest_stale(experiment):
+    manifest = read_manifest(write_manifest(build_manifest(experiment))[0])
+    (experiment / "P0003.zarr").mkdir()
+    assert manifest.is_stale()
+
+
+def test_recently_modified_folder_makes_manifest_stale(experiment):
+    (experiment / "notes.txt").touch()
+    manifest = build_manifest(experiment)
+    assert manifest.folder_mtime_ns is None
+    path, written = write_manifest(manifest)
+    assert written.is_stale()
+    assert read_manifest(path).is_stale()
+    settle_folder(experiment)
+    assert not build_manifest(experiment).is_stale()
+
+
+def test_finder_uses_fresh_manifest_without_listing(experiment, monkeypatch):
+    manifest = read_manifest(write_manifest(build_manifest(experiment))[0])
+    expected = find_single_path_by_fov(experiment, extension=".zarr")
+
+    def fail_listdir(_):
+        raise AssertionError("Folder should not be listed")
+
+    monkeypatch.setattr("gertils.pathtools.os.listdir", fail_listdir)
+    assert find_single_path_by_fov(experiment, extension=".zarr", manifest=manifest) == expected
+
+
+def test_finder_falls_back_to_listing_when_manifest_is_stale(experiment):
+    manifest = build_manifest(experiment)
+    write_manifest(manifest, experiment.parent / "manifest.json")
+    (experiment / "P0003.zarr").mkdir()
+    found = find_single_path_by_fov(experiment, extension=".zarr", manifest=manifest)
+    assert FieldOfViewFrom1(3) in found
+
+
+def test_manifest_is_for_folder_however_named(experiment, monkeypatch):
+    monkeypatch.chdir(experiment.parent)
+    manifest = build_manifest("experiment")
+    assert manifest.folder.is_absolute()
+    assert find_single_path_by_fov(experiment, extension=".zarr", manifest=manifest) == (
+        find_single_path_by_fov(experiment, extension=".zarr")
+    )
+    relative = find_single_path_by_fov("experiment", extension=".zarr", manifest=manifest)
+    assert relative == find_single_path_by_fov("experiment", extension=".zarr")
+    assert manifest.get_entry_by_path(relative[FieldOfViewFrom1(2)]) is not None
+
+
+def test_manifest_read_from_another_directory(experiment, tmp_path, monkeypatch):
+    monkeypatch.chdir(experiment.parent)
+    path, _ = write_manifest(build_manifest("experiment"))
+    monkeypatch.chdir(tmp_path.parent)
+    loaded = read_manifest(path)
+    assert loaded.folder == experiment.resolve()
+    assert loaded.entries == build_manifest(experiment).entries
+
+
+def test_finder_rejects_manifest_for_other_extension(experiment):
+    with pytest.raises(ValueError, match="Manifest is for"):
+        find_single_path_by_fov(experiment, extension=".tif", manifest=build_manifest(experiment))
+
+
+def test_read_zarr_uses_manifest_instead_of_probing(experiment, monkeypatch):
+    manifest = build_manifest(experiment)
+    monkeypatch.setattr(zarr_tools, "get_zarr_data_root", lambda _: None)
+    assert read_zarr(experiment / "P0002.zarr", manifest=manifest).tolist() == [[1] * 4] * 4
+
+
+def test_command_writes_manifest(experiment, tmp_path):
+    output = tmp_path / "out.json"
+    main([str(experiment), "--output", str(output)])
+    assert read_manifest(output).entries == build_manifest(experiment).entries
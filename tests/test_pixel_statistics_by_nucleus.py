@@ -0,0 +1,92 @@
+"""Tests for computing pixel value statistics with spots grouped by nucleus"""
+
+import numpy as np
+import pytest
+
+from gertils.geometry import BoundingBox2D, ImagePoint3D
+from gertils.pixel_value_statistics import (
+    compute_pixel_statistics,
+    compute_pixel_statistics_by_nucleus,
+)
+from gertils.types import ImagingChannel, NucleusNumber
+
+CHANNELS = [ImagingChannel(1), ImagingChannel(0)]
+DIAMETER = 4
+IMG = np.random.default_rng(42).integers(0, 4096, size=(2, 5, 32, 40), dtype=np.uint16)
+BOXES = {
+    NucleusNumber(1): BoundingBox2D(x_min=0, x_max=12, y_min=0, y_max=10),
+    NucleusNumber(2): BoundingBox2D(x_min=15, x_max=38, y_min=12, y_max=30),
+    NucleusNumber(3): BoundingBox2D(x_min=30, x_max=40, y_min=0, y_max=8),  # no spots
+}
+SPOTS = [
+    (NucleusNumber(2), ImagePoint3D(x=20.0, y=15.3, z=2.0)),
+    (NucleusNumber(1), ImagePoint3D(x=0.5, y=1.2, z=1.4)),  # clipped in x and y
+    (NucleusNumber(2), ImagePoint3D(x=37.9, y=29.8, z=3.0)),  # clipped at far edges
+    (NucleusNumber(1), ImagePoint3D(x=6.0, y=5.0, z=0.6)),
+    (NucleusNumber(2), ImagePoint3D(x=25.2, y=20.7, z=4.0)),  # z-slab clipped at top
+    (NucleusNumber(2), ImagePoint3D(x=30.0, y=25.0, z=3.4)),
+]
+
+
+def compute_by_nucleus(spots=SPOTS, boxes=BOXES):
+    return compute_pixel_statistics_by_nucleus(
+        IMG,
+        spots,
+        boxes,
+        channels=CHANNELS,
+        diameter=DIAMETER,
+        channel_column="channel",
+        nucleus_column="nucleus",
+    )
+
+
+def test_spot_records_match_per_spot_computation():
+    observed = compute_by_nucleus().spot_records
+    assert len(observed) == len(SPOTS)
+    for (nuc, pt), obs_records in zip(SPOTS, observed, strict=True):
+        expected = compute_pixel_statistics(
+            IMG, pt, channels=CHANNELS, diameter=DIAMETER, channel_column="channel"
+        )
+        assert [{k: v for k, v in rec.items() if k != "nucleus"} for rec in obs_records] == [
+            pytest.approx(rec) for rec in expected
+        ]
+        assert all(rec["nucleus"] == nuc.get for rec in obs_records)
+
+
+def test_background_excludes_spot_windows():
+    records = compute_by_nucleus().background_records
+    assert [(r["nucleus"], r["channel"]) for r in records] == [
+        (n, c.get) for n in (1, 2, 3) for c in CHANNELS
+    ]
+    box = BOXES[NucleusNumber(2)]
+    mask = np.zeros(IMG.shape[2:], dtype=bool)
+    mask[box.y_min : box.y_max, box.x_min : box.x_max] = True
+    for nuc, pt in SPOTS:
+        if nuc == NucleusNumber(2):
+            left = round(pt.x - DIAMETER / 2)
+            top = round(pt.y - DIAMETER / 2)
+            mask[max(0, top) : top + DIAMETER, max(0, left) : left + DIAMETER] = False
+    (record,) = (r for r in records if r["nucleus"] == 2 and r["channel"] == 0)  # noqa: PLR2004
+    values = IMG[0][:, mask]
+    assert record["background_mean"] == pytest.approx(values.mean())
+    assert record["background_sigma"] == pytest.approx(values.std())
+    assert record["background_min"] == values.min()
+    assert record["background_med"] == np.median(values)
+    assert record["background_max"] == values.max()
+
+
+def test_spot_without_nucleus_box_is_an_error():
+    with pytest.raises(ValueError, match="with spots but no bounding box"):
+        compute_by_nucleus(boxes={NucleusNumber(1): BOXES[NucleusNumber(1)]})
+
+
+@pytest.mark.parametrize(
+    "bounds",
+    [
+        dict(x_min=1, x_max=1, y_min=0, y_max=2),
+        dict(x_min=0, x_max=2, y_min=-1, y_max=2),
+    ],
+)
+def test_bounding_box_must_be_nonempty_and_nonnegative(bounds):
+    with pytest.raises(ValueError):  # noqa: PT011
+        BoundingBox2D(**bounds)
@@ -0,0 +1,139 @@
+"""Tests for the persistent cache of pixel value statistics"""
+
+import os
+
+import numpy as np
+import pytest
+import zarr  # type: ignore[import]
+
+from gertils import pixel_statistics_cache as cache_module
+from gertils.geometry import ImagePoint3D
+from gertils.pixel_statistics_cache import PixelStatisticsCache
+from gertils.pixel_value_statistics import compute_pixel_statistics
+from gertils.types import ImagingChannel
+
+CHANNELS = [ImagingChannel(0), ImagingChannel(1)]
+POINTS = [ImagePoint3D(x=5.0, y=6.0, z=2.0), ImagePoint3D(x=12.5, y=3.2, z=1.0)]
+
+
+def make_store(path, seed=0):
+    img = np.random.default_rng(seed).integers(0, 1000, size=(2, 4, 16, 16), dtype=np.uint16)
+    zarr.save_array(str(path), img, chunks=(1, 1, 8, 8))
+    return img
+
+
+def compute(cache, store, points=POINTS, diameter=4):
+    return cache.compute_for_store(
+        store, points, channels=CHANNELS, diameter=diameter, channel_column="channel"
+    )
+
+
+def test_results_match_direct_computation_on_miss_and_hit(tmp_path):
+    store = tmp_path / "P0001.zarr"
+    img = make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    expected = [
+        compute_pixel_statistics(img, pt, channels=CHANNELS, diameter=4, channel_column="channel")
+        for pt in POINTS
+    ]
+    assert compute(cache, store) == expected
+    assert compute(cache, store) == expected
+
+
+def test_hit_does_not_read_image(tmp_path, monkeypatch):
+    store = tmp_path / "P0001.zarr"
+    make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    first = compute(cache, store)
+
+    def fail_read(_):
+        raise AssertionError("Image should not be read on cache hit")
+
+    monkeypatch.setattr(cache_module, "read_zarr", fail_read)
+    assert compute(cache, store) == first
+
+
+def test_hit_on_unchanged_store_does_not_hash_its_content(tmp_path, monkeypatch):
+    store = tmp_path / "P0001.zarr"
+    make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    first = compute(cache, store)
+    hashed = []
+    original = cache_module.compute_zarr_store_digest
+
+    def spy(root):
+        hashed.append(root)
+        return original(root)
+
+    monkeypatch.setattr(cache_module, "compute_zarr_store_digest", spy)
+    assert compute(cache, store) == first
+    assert hashed == []
+    os.utime(store / ".zarray")  # same content, but no longer known to be
+    assert compute(cache, store) == first
+    assert hashed == [store]
+    assert compute(cache, store) == first
+    assert hashed == [store]
+
+
+@pytest.mark.parametrize(
+    ("change_data", "diameter"),
+    [(True, 4), (False, 6)],
+    ids=["new-data", "new-diameter"],
+)
+def test_changed_inputs_are_recomputed(tmp_path, monkeypatch, change_data, diameter):
+    store = tmp_path / "P0001.zarr"
+    make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    compute(cache, store, diameter=4)
+    if change_data:
+        make_store(store, seed=1)
+    calls = []
+    original = cache_module.compute_pixel_statistics
+
+    def spy(*args, **kwargs):
+        calls.append(None)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cache_module, "compute_pixel_statistics", spy)
+    compute(cache, store, diameter=diameter)
+    assert len(calls) == len(POINTS)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = tmp_path / "P0001.zarr"
+    make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    compute(cache, store, diameter=2)
+    (entry_size,) = (p.stat().st_size for p in (tmp_path / "cache").glob("*.npz"))
+    (record_size,) = (p.stat().st_size for p in (tmp_path / "cache").glob("*.digest.json"))
+    small_cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=2 * entry_size + record_size)
+    compute(small_cache, store, diameter=4)
+    compute(small_cache, store, diameter=6)
+    assert len(list((tmp_path / "cache").glob("*.npz"))) == 2  # noqa: PLR2004
+
+
+def test_digest_records_count_toward_size_limit(tmp_path):
+    stores = [tmp_path / f"P{i:04}.zarr" for i in range(1, 4)]
+    for i, store in enumerate(stores):
+        make_store(store, seed=i)
+    folder = tmp_path / "cache"
+    compute(PixelStatisticsCache(folder, max_bytes=10**7), stores[0])
+    max_bytes = sum(p.stat().st_size for p in folder.iterdir())
+    cache = PixelStatisticsCache(folder, max_bytes=max_bytes)
+    for store in stores[1:]:
+        compute(cache, store)
+    assert sum(p.stat().st_size for p in folder.iterdir()) <= max_bytes
+    assert len(list(folder.glob("*.digest.json"))) < len(stores)
+
+
+def test_empty_points_are_supported(tmp_path):
+    store = tmp_path / "P0001.zarr"
+    make_store(store)
+    cache = PixelStatisticsCache(tmp_path / "cache", max_bytes=10**7)
+    assert compute(cache, store, points=[]) == []
+    assert compute(cache, store, points=[]) == []
+
+
+def test_max_bytes_must_be_positive(tmp_path):
+    with pytest.raises(ValueError, match="Maximum cache size must be positive"):
+        PixelStatisticsCache(tmp_path, max_bytes=0)
@@ -0,0 +1,109 @@
+"""Tests for rechunking of ZARR stores"""
+
+import numpy as np
+import pytest
+import zarr  # type: ignore[import]
+
+from gertils.zarr_tools import (
+    estimate_window_decode_bytes,
+    read_zarr,
+    rechunk_zarr,
+    suggest_window_chunks,
+)
+
+
+@pytest.fixture()
+def plane_chunked_store(tmp_path):
+    data = np.random.default_rng(0).integers(0, 1000, size=(2, 5, 64, 64), dtype=np.uint16)
+    root = tmp_path / "P0001.zarr"
+    group = zarr.open_group(str(root), mode="w")
+    arr = group.array("0", data, chunks=(1, 1, 64, 64))
+    arr.attrs["pixel_size"] = 0.1
+    return root, data
+
+
+def test_window_decode_bytes_of_whole_plane_chunks():
+    # Each window touches 3 planes of 1 channel, fully decoding each.
+    assert (
+        estimate_window_decode_bytes(
+            (1, 10, 2048, 2048), (1, 1, 2048, 2048), itemsize=2, window=(1, 3, 9, 9)
+        )
+        == 3 * 2048 * 2048 * 2
+    )
+
+
+def test_window_decode_bytes_never_exceeds_whole_array():
+    shape = (2, 5, 64, 64)
+    assert (
+        estimate_window_decode_bytes(shape, (1, 1, 8, 8), itemsize=1, window=shape)
+        == 2 * 5 * 64 * 64
+    )
+
+
+def test_suggested_chunks_beat_plane_chunks():
+    shape = (2, 10, 2048, 2048)
+    window = (2, 3, 9, 9)
+    chunks = suggest_window_chunks(shape, itemsize=2, window=window)
+    assert chunks[2] < shape[2]
+    assert chunks[3] < shape[3]
+    assert estimate_window_decode_bytes(
+        shape, chunks, itemsize=2, window=window
+    ) < estimate_window_decode_bytes(shape, (1, 1, 2048, 2048), itemsize=2, window=window)
+
+
+def test_suggested_chunks_fit_size_limit():
+    chunks = suggest_window_chunks(
+        (1, 10, 2048, 2048), itemsize=2, window=(1, 10, 2048, 2048), max_chunk_bytes=4096
+    )
+    assert np.prod(chunks) * 2 <= 4096  # noqa: PLR2004
+
+
+def test_rank_mismatch_is_error():
+    with pytest.raises(ValueError, match="number of dimensions"):
+        suggest_window_chunks((10, 10), itemsize=1, window=(1, 3, 3))
+
+
+@pytest.mark.parametrize("chunks", [None, (2, 3, 16, 16), (1, 5, 7, 9)])
+def test_rechunk_preserves_data_and_attributes(tmp_path, plane_chunked_store, chunks):
+    source, data = plane_chunked_store
+    target = tmp_path / "rechunked.zarr"
+    report = rechunk_zarr(
+        source, target, window=(2, 3, 9, 9), chunks=chunks, memory_budget=32 * 1024, max_workers=2
+    )
+    assert report.source_chunks == (1, 1, 64, 64)
+    if chunks is not None:
+        assert report.target_chunks == chunks
+    assert (target / ".zarray").is_file()
+    assert np.array_equal(read_zarr(target), data)
+    rechunked = zarr.open_array(str(target), mode="r")
+    assert rechunked.chunks == report.target_chunks
+    assert rechunked.dtype == data.dtype
+    assert rechunked.attrs["pixel_size"] == 0.1  # noqa: PLR2004
+
+
+def test_rechunk_reports_fewer_bytes_per_window(tmp_path, plane_chunked_store):
+    source, _ = plane_chunked_store
+    report = rechunk_zarr(source, tmp_path / "rechunked.zarr", window=(2, 3, 9, 9))
+    assert report.bytes_per_window_after < report.bytes_per_window_before
+
+
+def test_chunk_over_memory_budget_is_error(tmp_path, plane_chunked_store):
+    source, _ = plane_chunked_store
+    with pytest.raises(ValueError, match="memory budget"):
+        rechunk_zarr(
+            source,
+            tmp_path / "rechunked.zarr",
+            window=(2, 3, 9, 9),
+            chunks=(2, 5, 64, 64),
+            memory_budget=1024,
+            max_workers=1,
+        )
+    assert not (tmp_path / "rechunked.zarr").exists()
+
+
+def test_existing_target_is_not_overwritten(tmp_path, plane_chunked_store):
+    source, _ = plane_chunked_store
+    target = tmp_path / "rechunked.zarr"
+    rechunk_zarr(source, target, window=(2, 3, 9, 9))
+    with pytest.raises(zarr.errors.ContainsArrayError):
+        rechunk_zarr(source, target, window=(2, 3, 9, 9))
@@ -0,0 +1,184 @@
+"""Tests for finding and reading ZARR datastores by URL"""
+
+from typing import ClassVar
+
+import fsspec  # type: ignore[import]
+import numpy as np
+import pytest
+import zarr  # type: ignore[import]
+from fsspec.implementations.memory import MemoryFileSystem  # type: ignore[import]
+
+from gertils.pathtools import find_multiple_paths_by_fov, find_single_path_by_fov, is_url
+from gertils.remote_stores import (
+    fetch_zarr_store,
+    find_multiple_urls_by_fov,
+    find_single_url_by_fov,
+    read_remote_zarr,
+)
+from gertils.types import FieldOfViewFrom1
+from gertils.zarr_tools import ZarrParseException, read_zarr
+
+EXPERIMENT_URL = "memory://bucket/experiment"
+
+
+@pytest.fixture()
+def memory_fs():
+    fs = fsspec.filesystem("memory")
+    yield fs
+    fs.rm("/bucket", recursive=True)
+
+
+def write_remote_store(url, data, *, nested=True):
+    if nested:
+        zarr.open_group(zarr.storage.FSStore(url), mode="w").array("0", data, chunks=(1, 1, 4, 4))
+    else:
+        zarr.save_array(zarr.storage.FSStore(url), data)
+
+
+@pytest.fixture()
+def experiment(memory_fs):
+    rng = np.random.default_rng(0)
+    data = {fov: rng.integers(0, 1000, size=(2, 3, 8, 8), dtype=np.uint16) for fov in (1, 2, 10)}
+    for fov, d in data.items():
+        write_remote_store(f"{EXPERIMENT_URL}/P{fov:04}.zarr", d)
+    memory_fs.pipe(f"{EXPERIMENT_URL}/P0001.csv", b"x,y\n")
+    memory_fs.pipe(f"{EXPERIMENT_URL}/notes.txt", b"")
+    return data
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("s3://bucket/experiment", True),
+        ("memory://bucket/experiment", True),
+        ("file:///data/experiment", False),
+        ("/data/experiment", False),
+    ],
+)
+def test_is_url(path, expected):
+    assert is_url(path) is expected
+
+
+@pytest.mark.parametrize("protocol", ["file", "local"])
+def test_local_url_is_read_and_searched_as_local_path(tmp_path, protocol):
+    data = np.arange(2 * 3 * 4 * 4, dtype=np.uint16).reshape(2, 3, 4, 4)
+    zarr.save_array(str(tmp_path / "P0001.zarr"), data)
+    (tmp_path / "P0001.csv").write_text("x,y\n")
+    url = f"{protocol}://{tmp_path}"
+    assert find_single_path_by_fov(url, extension=".zarr") == {
+        FieldOfViewFrom1(1): tmp_path / "P0001.zarr"
+    }
+    assert sorted(
+        find_multiple_paths_by_fov(url, extensions=[".zarr", ".csv"])[FieldOfViewFrom1(1)]
+    ) == [
+        tmp_path / "P0001.csv",
+        tmp_path / "P0001.zarr",
+    ]
+    assert np.array_equal(read_zarr(f"{url}/P0001.zarr"), data)
+
+
+def test_find_single_url_by_fov(experiment):
+    urls = find_single_url_by_fov(EXPERIMENT_URL, extension=".zarr")
+    assert urls == {
+        FieldOfViewFrom1(fov): f"memory:///bucket/experiment/P{fov:04}.zarr" for fov in experiment
+    }
+
+
+def test_find_multiple_urls_by_fov(experiment):
+    urls = find_multiple_urls_by_fov(EXPERIMENT_URL, extensions=[".zarr", ".csv"])
+    assert set(urls) == {FieldOfViewFrom1(fov) for fov in experiment}
+    assert sorted(urls[FieldOfViewFrom1(1)]) == [
+        "memory:///bucket/experiment/P0001.csv",
+        "memory:///bucket/experiment/P0001.zarr",
+    ]
+
+
+@pytest.mark.parametrize(
+    "find",
+    [
+        lambda url: find_single_path_by_fov(url, extension=".zarr"),
+        lambda url: find_multiple_paths_by_fov(url, extensions=[".zarr"]),
+    ],
+)
+def test_local_finders_point_to_url_finders(find):
+    with pytest.raises(ValueError, match=r"urls?_by_fov"):
+        find(EXPERIMENT_URL)
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_read_zarr_accepts_url(experiment, max_concurrency):
+    for url in find_single_url_by_fov(EXPERIMENT_URL, extension=".zarr").values():
+        data = read_remote_zarr(url, max_concurrency=max_concurrency)
+        assert np.array_equal(data, read_zarr(url))
+    assert np.array_equal(read_zarr(f"{EXPERIMENT_URL}/P0010.zarr"), experiment[10])
+
+
+@pytest.mark.usefixtures("memory_fs")
+def test_store_with_array_at_root():
+    data = np.arange(16, dtype=np.uint8).reshape(1, 1, 4, 4)
+    write_remote_store(f"{EXPERIMENT_URL}/P0001.zarr", data, nested=False)
+    assert np.array_equal(read_zarr(f"{EXPERIMENT_URL}/P0001.zarr"), data)
+
+
+@pytest.mark.usefixtures("experiment")
+def test_fetch_gets_only_the_array():
+    store = fetch_zarr_store(f"{EXPERIMENT_URL}/P0001.zarr")
+    assert ".zgroup" not in store
+    assert ".zarray" in store
+    assert len(store) == 1 + 2 * 3 * 2 * 2  # metadata, and chunks of (1, 1, 4, 4)
+
+
+@pytest.mark.usefixtures("experiment")
+def test_cache_folder_serves_later_reads(tmp_path, memory_fs):
+    url = f"{EXPERIMENT_URL}/P0002.zarr"
+    cache = tmp_path / "cache"
+    first = read_remote_zarr(url, cache_folder=cache)
+    assert any(cache.iterdir())
+    memory_fs.rm(f"{url}/0/0.0.0.0")
+    memory_fs.pipe(
+        f"{url}/0/0.0.0.0",
+        zarr.open_array(zarr.storage.FSStore(f"{url}/0")).compressor.encode(
+            np.ones((1, 1, 4, 4), dtype=np.uint16)
+        ),
+    )
+    assert np.array_equal(read_remote_zarr(url, cache_folder=cache), first)
+    assert not np.array_equal(read_remote_zarr(url), first)
+
+
+class BatchRecordingMemoryFileSystem(MemoryFileSystem):
+    """In-memory filesystem which claims to be asynchronous, recording each bulk fetch"""
+
+    protocol = ("batchrecordingmemory",)
+    async_impl = True
+    fetches: ClassVar[list[tuple[int, object]]] = []
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        return super()._strip_protocol(path.replace("batchrecordingmemory://", "memory://"))
+
+    def cat(self, path, **kwargs):
+        self.fetches.append((len(path), kwargs.get("batch_size")))
+        return {p: self.cat_file(p) for p in path}
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_async_fetch_is_bounded(tmp_path, use_cache):
+    fsspec.register_implementation(
+        "batchrecordingmemory", BatchRecordingMemoryFileSystem, clobber=True
+    )
+    BatchRecordingMemoryFileSystem.fetches.clear()
+    url = "batchrecordingmemory://bucket/experiment/P0001.zarr"
+    cache = tmp_path / "cache" if use_cache else None
+    data = read_remote_zarr(url, max_concurrency=3, cache_folder=cache)
+    assert np.array_equal(data, read_zarr(f"{EXPERIMENT_URL}/P0001.zarr"))
+    assert BatchRecordingMemoryFileSystem.fetches == [(1 + 2 * 3 * 2 * 2, 3)]
+    if use_cache:
+        read_remote_zarr(url, max_concurrency=3, cache_folder=cache)
+        assert len(BatchRecordingMemoryFileSystem.fetches) == 1  # all served from the cache
+
+
+def test_missing_array_metadata_is_error(memory_fs):
+    memory_fs.pipe(f"{EXPERIMENT_URL}/P0001.zarr/0/0.0.0.0", b"")
+    with pytest.raises(ZarrParseException):
+        read_zarr(f"{EXPERIMENT_URL}/P0001.zarr")
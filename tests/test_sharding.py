@@ -0,0 +1,93 @@
+"""Tests for planning the sharding of fields of view across batch job workers"""
+
+import pytest
+
+from gertils.sharding import (
+    ShardPlan,
+    estimate_fov_costs,
+    get_shard_index_from_environment,
+    main,
+    plan_shards,
+    read_shard_plan,
+    write_shard_plan,
+)
+from gertils.types import FieldOfViewFrom1
+
+
+def fovs_with_costs(*costs):
+    return {FieldOfViewFrom1(i): float(c) for i, c in enumerate(costs, start=1)}
+
+
+def test_lpt_balances_better_than_modulo():
+    costs = fovs_with_costs(10, 1, 1, 1, 9, 1, 1, 1)
+    plan = plan_shards(costs, num_shards=2)
+    assert sorted(plan.loads) == [12.0, 13.0]
+    modulo_loads = [sum(c for fov, c in costs.items() if fov.get % 2 == s) for s in range(2)]
+    assert max(plan.loads) < max(modulo_loads)
+
+
+def test_plan_is_deterministic_under_ties():
+    costs = fovs_with_costs(*([5] * 7))
+    first = plan_shards(costs, num_shards=3)
+    second = plan_shards(dict(reversed(list(costs.items()))), num_shards=3)
+    assert first == second
+    assert first.get_fovs(0) == [FieldOfViewFrom1(1), FieldOfViewFrom1(4), FieldOfViewFrom1(7)]
+
+
+def test_every_fov_is_assigned_exactly_once():
+    costs = fovs_with_costs(*range(1, 20))
+    plan = plan_shards(costs, num_shards=4)
+    assigned = [fov for shard in range(4) for fov in plan.get_fovs(shard)]
+    assert sorted(assigned) == sorted(costs)
+
+
+def test_plan_roundtrips_through_file(tmp_path):
+    plan = plan_shards(fovs_with_costs(3, 1, 4, 1, 5), num_shards=2)
+    assert read_shard_plan(write_shard_plan(plan, tmp_path / "plan.json")) == plan
+
+
+def test_costs_reflect_store_size_chunks_and_spots(tmp_path):
+    small = tmp_path / "P0001.zarr"
+    big = tmp_path / "P0002.zarr"
+    for store, num_chunks in [(small, 1), (big, 3)]:
+        store.mkdir()
+        (store / ".zarray").write_text("{}", encoding="utf-8")
+        for i in range(num_chunks):
+            (store / f"0.0.{i}").write_bytes(b"x" * 100)
+    paths = {FieldOfViewFrom1(1): small, FieldOfViewFrom1(2): big}
+    costs = estimate_fov_costs(
+        paths, spot_counts={FieldOfViewFrom1(1): 10}, chunk_cost=1000, spot_cost=7
+    )
+    assert costs == {FieldOfViewFrom1(1): 2 + 100 + 1000 + 70, FieldOfViewFrom1(2): 2 + 300 + 3000}
+
+
+def test_worker_selects_only_its_paths(tmp_path, monkeypatch):
+    for i in range(1, 6):
+        (tmp_path / f"P000{i}.zarr").mkdir()
+        (tmp_path / f"P000{i}.zarr" / "0").write_bytes(b"x" * (i * 1000))
+    output = tmp_path / "plan.json"
+    main([str(tmp_path), "--num-shards", "2", "--output", str(output)])
+    plan = read_shard_plan(output)
+    monkeypatch.setenv("SLURM_ARRAY_TASK_ID", "1")
+    shard = get_shard_index_from_environment()
+    paths = {FieldOfViewFrom1(i): tmp_path / f"P000{i}.zarr" for i in range(1, 6)}
+    selected = plan.select_paths(paths, shard=shard)
+    assert set(selected) == set(plan.get_fovs(1))
+    assert all(selected[fov] == paths[fov] for fov in selected)
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda: plan_shards({}, num_shards=0),
+        lambda: ShardPlan(
+            num_shards=2,
+            shard_by_fov={FieldOfViewFrom1(1): 2},
+            cost_by_fov={FieldOfViewFrom1(1): 1.0},
+        ),
+        lambda: plan_shards({}, num_shards=2).get_fovs(2),
+    ],
+)
+def test_invalid_shard_counts_and_indices(build):
+    with pytest.raises(ValueError):  # noqa: PT011
+        build()
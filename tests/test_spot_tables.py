@@ -0,0 +1,94 @@
+"""Tests for columnar spot table I/O"""
+
+import numpy as np
+import pytest
+
+from gertils.geometry import ImagePoint3D
+from gertils.spot_tables import (
+    SpotTableFormatException,
+    read_spot_table,
+    records_to_columns,
+    write_spot_table,
+)
+from gertils.types import FieldOfViewFrom1, ImagingChannel, TimepointFrom0, TraceIdFrom0
+
+COLUMNS = {
+    "fov": [2, 1, 2, 3, 1],
+    "trace": [0, 1, 2, 3, 4],
+    "timepoint": [5, 5, 6, 0, 1],
+    "channel": [0, 1, 0, 1, 0],
+    "z": [1.0, 2.5, 3.0, 0.0, 4.2],
+    "y": [10.0, 11.0, 12.0, 13.0, 14.0],
+    "x": [20.0, 21.0, 22.0, 23.0, 24.0],
+}
+TYPES = {"trace": TraceIdFrom0, "timepoint": TimepointFrom0, "channel": ImagingChannel}
+
+
+@pytest.fixture()
+def table_folder(tmp_path):
+    return write_spot_table(tmp_path / "spots", COLUMNS, column_types=TYPES, fov_column="fov")
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_roundtrip_groups_rows_by_fov(table_folder, mmap):
+    table = read_spot_table(table_folder, mmap=mmap)
+    assert len(table) == len(COLUMNS["fov"])
+    assert table.columns["fov"].tolist() == [1, 1, 2, 2, 3]
+    assert table.columns["trace"].tolist() == [1, 4, 0, 2, 3]
+    assert table.column_types == {**TYPES, "fov": FieldOfViewFrom1}
+
+
+def test_read_single_fov_without_copying(table_folder):
+    table = read_spot_table(table_folder, fovs=[FieldOfViewFrom1(2)], columns=["trace", "x"])
+    assert set(table.columns) == {"trace", "x"}
+    assert table.columns["trace"].tolist() == [0, 2]
+    assert isinstance(table.columns["x"], np.memmap)
+
+
+def test_read_multiple_and_absent_fovs(table_folder):
+    table = read_spot_table(
+        table_folder, fovs=[FieldOfViewFrom1(3), FieldOfViewFrom1(9), FieldOfViewFrom1(1)]
+    )
+    assert table.columns["trace"].tolist() == [3, 1, 4]
+    assert len(read_spot_table(table_folder, fovs=[FieldOfViewFrom1(9)])) == 0
+
+
+def test_wrapped_values_and_points(table_folder):
+    table = read_spot_table(table_folder, fovs=[FieldOfViewFrom1(1)])
+    assert table.get_wrapped("timepoint") == [TimepointFrom0(5), TimepointFrom0(1)]
+    assert table.to_points() == [
+        ImagePoint3D(x=21.0, y=11.0, z=2.5),
+        ImagePoint3D(x=24.0, y=14.0, z=4.2),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("update", "error_type", "message"),
+    [
+        ({"fov": [0, 1, 2, 3, 1]}, ValueError, "must be at least 1"),
+        ({"trace": [0.5, 1, 2, 3, 4]}, TypeError, "must hold integers"),
+        ({"x": [1.0]}, ValueError, "Columns differ in length"),
+    ],
+)
+def test_invalid_columns(tmp_path, update, error_type, message):
+    with pytest.raises(error_type, match=message):
+        write_spot_table(tmp_path, {**COLUMNS, **update}, column_types=TYPES, fov_column="fov")
+
+
+def test_read_from_folder_without_table(tmp_path):
+    with pytest.raises(SpotTableFormatException):
+        read_spot_table(tmp_path)
+
+
+def test_fov_filter_requires_grouped_table(tmp_path):
+    write_spot_table(tmp_path, COLUMNS)
+    with pytest.raises(ValueError, match="isn't grouped by field of view"):
+        read_spot_table(tmp_path, fovs=[FieldOfViewFrom1(1)])
+
+
+def test_records_to_columns():
+    columns = records_to_columns([{"ch": 0, "mean": 1.5}, {"ch": 1, "mean": 2.5}])
+    assert columns["ch"].tolist() == [0, 1]
+    assert columns["mean"].tolist() == [1.5, 2.5]
+    with pytest.raises(ValueError, match="differ"):
+        records_to_columns([{"ch": 0}, {"mean": 1.0}])
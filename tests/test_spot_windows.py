@@ -0,0 +1,94 @@
+"""Tests for extraction of pixel windows around spots"""
+
+import numpy as np
+import pytest
+
+from gertils.geometry import ImagePoint3D
+from gertils.pixel_value_statistics import compute_pixel_statistics
+from gertils.spot_windows import SpotWindows, extract_spot_windows
+from gertils.types import ImagingChannel
+
+IMG = np.random.default_rng(3).integers(1, 1000, size=(3, 5, 20, 18), dtype=np.uint16)
+CHANNELS = [ImagingChannel(2), ImagingChannel(0)]
+INTERIOR = ImagePoint3D(x=9.0, y=10.0, z=2.0)
+CORNER = ImagePoint3D(x=0.6, y=19.5, z=4.0)
+TOP_EDGE = ImagePoint3D(x=9.0, y=10.0, z=4.8)  # rounds to z=5, beyond the last of 5 slices
+
+
+def test_interior_window_matches_image():
+    result = extract_spot_windows(IMG, [INTERIOR], channels=CHANNELS, diameter=4)
+    assert result.windows.shape == (1, 2, 5, 4, 4)
+    assert result.valid.all()
+    assert result.origins.tolist() == [[0, 8, 7]]
+    assert np.array_equal(result.windows[0], IMG[[2, 0], :, 8:12, 7:11])
+
+
+def test_window_supports_same_statistics_as_direct_computation():
+    points = [INTERIOR, CORNER, TOP_EDGE]
+    result = extract_spot_windows(IMG, points, channels=CHANNELS, diameter=5, plus_minus_planes=1)
+    assert result.origins[2, 0] == 3  # noqa: PLR2004
+    for i, pt in enumerate(points):
+        expected = compute_pixel_statistics(
+            IMG, pt, channels=CHANNELS, diameter=5, channel_column="ch"
+        )
+        for c, rec in enumerate(expected):
+            values = result.windows[i, c][result.valid[i]]
+            assert values.mean() == pytest.approx(rec["center_mean"])
+            assert values.max() == rec["center_max"]
+
+
+@pytest.mark.parametrize("padding", ["constant", "edge"])
+def test_out_of_bounds_pixels_are_padded_and_flagged(padding):
+    result = extract_spot_windows(
+        IMG,
+        [CORNER],
+        channels=CHANNELS,
+        diameter=4,
+        plus_minus_planes=1,
+        padding=padding,
+        fill_value=0,
+    )
+    assert result.origins.tolist() == [[3, 18, -1]]
+    valid = result.valid[0]
+    assert valid.shape == (3, 4, 4)
+    assert valid.sum() == 2 * 2 * 3  # z-slices 3-4, y 18-19, x 0-2
+    padded = result.windows[0][:, ~valid]
+    if padding == "constant":
+        assert (padded == 0).all()
+    else:
+        assert (padded > 0).all()
+        # Left column is padded with the leftmost real column.
+        assert np.array_equal(result.windows[0, :, 0, 0, 0], IMG[[2, 0], 3, 18, 0])
+
+
+@pytest.mark.parametrize(
+    ("write", "read"),
+    [
+        (SpotWindows.to_npy_folder, SpotWindows.from_npy_folder),
+        (SpotWindows.to_zarr, SpotWindows.from_zarr),
+    ],
+    ids=["npy", "zarr"],
+)
+def test_roundtrip_through_disk(tmp_path, write, read):
+    result = extract_spot_windows(
+        IMG, [INTERIOR, CORNER], channels=CHANNELS, diameter=3, plus_minus_planes=0
+    )
+    loaded = read(write(result, tmp_path / "windows"))
+    for name in ("windows", "valid", "origins", "channels"):
+        assert np.array_equal(np.asarray(getattr(loaded, name)), getattr(result, name))
+
+
+def test_point_beyond_last_z_slice_is_error():
+    with pytest.raises(ValueError, match="z-slice"):
+        extract_spot_windows(
+            IMG,
+            [ImagePoint3D(x=9.0, y=10.0, z=5.2)],
+            channels=CHANNELS,
+            diameter=4,
+            plus_minus_planes=1,
+        )
+
+
+def test_no_points_gives_empty_windows():
+    result = extract_spot_windows(IMG, [], channels=CHANNELS, diameter=3, plus_minus_planes=1)
+    assert result.windows.shape == (0, 2, 3, 3, 3)
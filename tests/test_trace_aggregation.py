@@ -0,0 +1,70 @@
+"""Tests for grouped aggregation of spot data by trace and timepoint"""
+
+import numpy as np
+import pytest
+
+from gertils.trace_aggregation import summarize_by_timepoint, summarize_by_trace
+
+TRACE_IDS = np.array([3, 0, 3, 0, 3, 7])
+TIMEPOINTS = np.array([0, 0, 1, 2, 2, 1])
+SIGNAL = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+
+@pytest.mark.parametrize("offset", [0, 10**9], ids=["dense", "sparse"])
+def test_summarize_by_trace(offset):
+    summary = summarize_by_trace(
+        TRACE_IDS + offset, TIMEPOINTS, {"signal": SIGNAL}, num_timepoints=4
+    )
+    assert summary.trace_ids.tolist() == [offset, 3 + offset, 7 + offset]
+    assert summary.counts.tolist() == [2, 3, 1]
+    assert summary.means["signal"].tolist() == [3.0, 3.0, 6.0]
+    assert summary.present_timepoints.tolist() == [
+        [True, False, True, False],
+        [True, True, True, False],
+        [False, True, False, False],
+    ]
+    assert summary.missing_timepoint_counts.tolist() == [2, 1, 3]
+    assert summary.get_missing_timepoints(7 + offset).tolist() == [0, 2, 3]
+
+
+def test_summarize_by_trace__infers_number_of_timepoints():
+    summary = summarize_by_trace(TRACE_IDS, TIMEPOINTS, {})
+    assert summary.present_timepoints.shape == (3, 3)
+
+
+def test_summarize_by_timepoint():
+    summary = summarize_by_timepoint(
+        np.concatenate([TRACE_IDS, [3]]),
+        np.concatenate([TIMEPOINTS, [2]]),
+        {"signal": np.concatenate([SIGNAL, [0.0]])},
+    )
+    assert summary.timepoints.tolist() == [0, 1, 2]
+    assert summary.counts.tolist() == [2, 2, 3]
+    assert summary.trace_counts.tolist() == [2, 2, 2]
+    assert summary.means["signal"].tolist() == [1.5, 4.5, 3.0]
+
+
+def test_empty_input():
+    summary = summarize_by_trace([], [], {"signal": []})
+    assert summary.trace_ids.size == 0
+    assert summary.present_timepoints.shape == (0, 0)
+    assert summarize_by_timepoint([], [], {}).timepoints.size == 0
+
+
+@pytest.mark.parametrize(
+    ("trace_ids", "timepoints", "signal", "error_type", "message"),
+    [
+        ([0.5], [0], [1.0], TypeError, "Non-integer trace ID"),
+        ([0], [-1], [1.0], ValueError, "timepoint must be nonnegative"),
+        ([0, 1], [0], [1.0, 2.0], ValueError, "Columns differ in length"),
+        ([0], [0], [1.0, 2.0], ValueError, "Columns differ in length"),
+    ],
+)
+def test_invalid_input(trace_ids, timepoints, signal, error_type, message):
+    with pytest.raises(error_type, match=message):
+        summarize_by_trace(trace_ids, timepoints, {"signal": signal})
+
+
+def test_timepoint_beyond_declared_count_is_an_error():
+    with pytest.raises(ValueError, match="out of range"):
+        summarize_by_trace(TRACE_IDS, TIMEPOINTS, {}, num_timepoints=2)